@@ -0,0 +1,69 @@
+"""
+Measures events per second going through InputInterpreter.read for mouse tracking heavy input.
+
+python benchmarks/bench_input.py [--pool] [--batches N]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from retui.input_handling import EventPool, InputInterpreter  # noqa: E402
+
+
+class PipeInput:
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+
+    def fileno(self):
+        return self.read_fd
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+def make_batch() -> bytes:
+    # clicks, wheel and keys - motion would be coalesced into single event
+    batch = []
+    for x in range(1, 40):
+        batch.append(f"\x1b[<0;{x};5M\x1b[<0;{x};5m\x1b[<64;{x};6M\x1b[A")
+    return "".join(batch).encode()
+
+
+def run(batches: int, pool: bool) -> float:
+    pipe = PipeInput()
+    event_pool = EventPool() if pool else None
+    interpreter = InputInterpreter(pipe, event_pool)
+    batch = make_batch()
+    count = 0
+    gc.collect()
+    collections = sum(stat["collections"] for stat in gc.get_stats())
+    start = time.perf_counter()
+    for _ in range(batches):
+        os.write(pipe.write_fd, batch)
+        events = interpreter.read()
+        count += len(events)
+        if event_pool:
+            event_pool.release(events)
+    elapsed = time.perf_counter() - start
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - collections
+    pipe.close()
+    print(f"pool={pool} events={count} time={elapsed:.3f}s events/s={count / elapsed:,.0f} gc={collections}")
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Input parsing throughput")
+    parser.add_argument("--pool", action="store_true", help="reuse events with EventPool")
+    parser.add_argument("--batches", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.batches, args.pool)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Runs benchmark scenarios, reports time and allocations per call and compares them with baseline.
+
+python benchmarks/run.py [scenario ...] [--repeat N] [--save] [--baseline FILE] [--threshold 1.5]
+
+Exits with 1 when any scenario is slower or allocates more than threshold times its baseline value.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+from scenarios import SCENARIOS  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def measure(setup, repeat: int) -> dict:
+    run = setup()
+    # warm up - first call fills caches, it is not what is measured
+    run()
+    times = []
+    for _ in range(repeat):
+        # same as timeit - collections triggered by earlier allocations would be counted to random call
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+
+    # allocations measured separately, tracemalloc slows down every allocation
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    run()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "peak_kib": (peak - before) / 1024,
+        "retained_kib": (after - before) / 1024,
+    }
+
+
+def compare(name: str, result: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    base = baseline.get(name)
+    if base is None:
+        return regressions
+    for key in ("min_s", "peak_kib"):
+        # small values are noise, skip them
+        floor = 1e-5 if key == "min_s" else 16
+        if result[key] > max(base[key], floor) * threshold:
+            regressions.append(f"{name}: {key} {result[key]:.6g} > {threshold} * {base[key]:.6g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scenarios", nargs="*", help=f"subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="store results as new baseline")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    args = parser.parse_args()
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="UTF-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'scenario':<24}{'min ms':>10}{'median ms':>12}{'peak KiB':>12}{'retained KiB':>14}{'vs base':>10}")
+    for name in names:
+        result = measure(SCENARIOS[name], args.repeat)
+        results[name] = result
+        base = None if args.save else baseline.get(name)
+        ratio = f"{result['min_s'] / base['min_s']:.2f}x" if base and base["min_s"] > 0 else "-"
+        print(
+            f"{name:<24}{result['min_s'] * 1000:>10.3f}{result['median_s'] * 1000:>12.3f}"
+            f"{result['peak_kib']:>12.1f}{result['retained_kib']:>14.1f}{ratio:>10}"
+        )
+        if not args.save:
+            regressions.extend(compare(name, result, baseline, args.threshold))
+
+    if args.save:
+        # scenarios not run keep their baseline
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="UTF-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved: {args.baseline}")
+        return 0
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
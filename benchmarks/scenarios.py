@@ -0,0 +1,262 @@
+"""
+Benchmark scenarios - each one prepares its data and returns function that is timed.
+Everything runs on HeadlessTerminal, so no TTY is needed.
+"""
+import atexit
+import json
+import os
+import tempfile
+
+from bench_input import PipeInput, make_batch
+
+from retui import App, json_loader
+from retui.enums import Dock
+from retui.input_handling import InputInterpreter
+from retui.terminal.headless import HeadlessTerminal
+from retui.theme import CssParser
+from retui.widgets import Pane, Text, TextBox
+
+SCENARIOS = {}
+
+LARGE_CSS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "print_tests",
+    "functional",
+    "css_parser",
+    "long_one_line_wykop_pl.css",
+)
+
+
+def scenario(name: str):
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+
+    return register
+
+
+def temp_file(suffix: str, content: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "w", encoding="UTF-8") as f:
+        f.write(content)
+    atexit.register(remove_files, path, path + CssParser.CACHE_SUFFIX)
+    return path
+
+
+def remove_files(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def headless_app(columns: int = 200, rows: int = 60) -> App:
+    return App(terminal=HeadlessTerminal(columns=columns, rows=rows))
+
+
+@scenario("layout_deep")
+def layout_deep():
+    # 200 nested panes, each docked inside previous one
+    app = headless_app()
+    parent = app
+    for _ in range(200):
+        pane = Pane(app=app, dock=Dock.FILL, soft_border=True)
+        parent.add_widget(pane)
+        parent = pane
+    return app.update_dimensions
+
+
+@scenario("layout_wide")
+def layout_wide():
+    # 2000 floating text boxes in single pane
+    app = headless_app()
+    root = Pane(app=app, dock=Dock.FILL)
+    app.add_widget(root)
+    for idx in range(2000):
+        root.add_widget(TextBox(app=app, x=idx % 150, y=idx % 50, width=10, height=3, dock=Dock.NONE, text=f"{idx}"))
+    return app.update_dimensions
+
+
+@scenario("layout_incremental")
+def layout_incremental():
+    # one resized box among 2000, only it and its siblings are docked again
+    app = headless_app()
+    root = Pane(app=app, dock=Dock.FILL)
+    app.add_widget(root)
+    boxes = []
+    for idx in range(2000):
+        box = TextBox(app=app, x=idx % 150, y=idx % 50, width=10, height=3, dock=Dock.NONE)
+        root.add_widget(box)
+        boxes.append(box)
+    app.update_dimensions()
+    box = boxes[1000]
+
+    def run():
+        box.dimensions.width = 11 if box.dimensions.width == 10 else 10
+        box.invalidate_layout()
+        app.update_dimensions_dirty()
+
+    return run
+
+
+@scenario("text_prepare_lines")
+def text_prepare_lines():
+    # new 100k lines text each call, so layout cache of Text doesn't help
+    source = "\n".join(f"line {idx} " * 8 for idx in range(100000))
+
+    def run():
+        Text(source).prepare_lines(width=80, height=50)
+
+    return run
+
+
+@scenario("text_scroll")
+def text_scroll():
+    text = Text("\n".join(f"line {idx} " * 8 for idx in range(100000)))
+    text.prepare_lines(width=80, height=50)
+
+    def run():
+        if not text.scroll(49):
+            text.scroll(-100000)
+
+    return run
+
+
+@scenario("border_draw")
+def border_draw():
+    # full redraw of 200 boxes with text, render cache disabled by changing text
+    app = headless_app()
+    boxes = []
+    for idx in range(200):
+        box = TextBox(app=app, x=(idx * 10) % 190, y=(idx * 3) % 57, width=10, height=3, dock=Dock.NONE)
+        app.add_widget(box)
+        boxes.append(box)
+    app.update_dimensions()
+    state = {"idx": 0}
+
+    def run():
+        state["idx"] += 1
+        for box in boxes:
+            box.text = f"{state['idx']}"
+        app.draw(force=True)
+        app.terminal.output.seek(0)
+        app.terminal.output.truncate()
+
+    return run
+
+
+@scenario("border_redraw_cached")
+def border_redraw_cached():
+    # full redraw after e.g. resize, content didn't change
+    app = headless_app()
+    for idx in range(200):
+        app.add_widget(TextBox(app=app, x=(idx * 10) % 190, y=(idx * 3) % 57, width=10, height=3, dock=Dock.NONE))
+    app.update_dimensions()
+
+    def run():
+        app.draw(force=True)
+        app.terminal.output.seek(0)
+        app.terminal.output.truncate()
+
+    return run
+
+
+@scenario("input_parse")
+def input_parse():
+    pipe = PipeInput()
+    interpreter = InputInterpreter(pipe)
+    batch = make_batch()
+
+    def run():
+        os.write(pipe.write_fd, batch)
+        interpreter.read_ready()
+
+    return run
+
+
+def json_layout(panes: int = 50, children: int = 20, visible: int = 50) -> str:
+    # panes past visible are collapsed to zero size, like inactive tabs
+    widgets = []
+    for idx in range(panes):
+        size = 20 if idx < visible else 0
+        widgets.append(
+            {"id": f"pane{idx}", "type": "Pane", "x": idx, "y": 0, "width": size, "height": size, "dock": "NONE"}
+        )
+        for child in range(children):
+            widgets.append(
+                {
+                    "parent_id": f"pane{idx}",
+                    "type": "TextBox",
+                    "x": 0,
+                    "y": child,
+                    "width": 10,
+                    "height": 3,
+                    "dock": "NONE",
+                    "text": f"box {child}",
+                }
+            )
+    return temp_file(".json", json.dumps({"name": "bench", "color": False, "widgets": widgets}))
+
+
+@scenario("json_load")
+def json_load():
+    path = json_layout()
+
+    def run():
+        json_loader.app_from_json(path, terminal=HeadlessTerminal(columns=200, rows=60), cache=False)
+
+    return run
+
+
+@scenario("json_load_cached")
+def json_load_cached():
+    path = json_layout()
+
+    def run():
+        json_loader.app_from_json(path, terminal=HeadlessTerminal(columns=200, rows=60))
+
+    return run
+
+
+def json_first_layout(lazy: bool):
+    # 2000 widgets, only 10 of 100 panes shown
+    path = json_layout(panes=100, visible=10)
+
+    def run():
+        app = json_loader.app_from_json(
+            path, terminal=HeadlessTerminal(columns=200, rows=60), lazy=lazy, cache=False
+        )
+        app.clear(reuse=False)
+        app.update_dimensions()
+
+    return run
+
+
+@scenario("json_first_layout")
+def json_first_layout_eager():
+    return json_first_layout(lazy=False)
+
+
+@scenario("json_first_layout_lazy")
+def json_first_layout_lazy():
+    return json_first_layout(lazy=True)
+
+
+@scenario("css_parse")
+def css_parse():
+    def run():
+        CssParser.parse(LARGE_CSS, None, cache=False)
+
+    return run
+
+
+@scenario("css_parse_cached")
+def css_parse_cached():
+    # stylesheet copied aside, so cache file is not left in source tree
+    with open(LARGE_CSS, "r", encoding="UTF-8") as source:
+        path = temp_file(".css", source.read())
+
+    def run():
+        CssParser.parse(path, None)
+
+    return run
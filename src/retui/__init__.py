@@ -8,19 +8,27 @@ __license__ = "MIT"
 
 import asyncio
 import concurrent.futures
+import contextlib
 import dataclasses
+import io
 import logging
+import os
+import select
 import signal
 import sys
 import threading
 from collections import deque
 from typing import Union
 
+import retui.file_watch
 import retui.input_handling
+import retui.spatial
 import retui.terminal
 import retui.terminal.base
+import retui.theme
 import retui.widgets
-from retui.base import Color, ColorBits, TerminalColor
+from retui.base import Color, ColorBits, Rectangle, TerminalColor
+from retui.default_themes import DefaultThemes  # noqa: F401 - re-exported
 from retui.mapping import log_widgets
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -28,7 +36,6 @@ _log = logging.getLogger(__name__)
 
 # TASK LIST:
 # TODO: Percent handling inside Pane - guess will need to add start_x, start_y + width height taken from parent
-# TODO: Redraw only when covered - blinking over ssh in tmux - temporary: redraw only on size change
 # TODO: trim line to screen width on debug prints
 # TODO: Relative dimensions, 1 Top 80 percent, 2nd bottom 20 percent - got 1 free line..
 # TODO: soft border and docked widget - see docked_dimensions generation
@@ -44,16 +51,34 @@ def add_window_logger(level: int = logging.DEBUG) -> logging.StreamHandler:
 
 
 class App(retui.widgets.Pane):
-    def __init__(self, debug: bool = False, **kwargs):
+    def __init__(
+        self,
+        debug: bool = False,
+        max_fps: int = 30,
+        event_pool: bool = False,
+        terminal: retui.terminal.base.Terminal = None,
+        **kwargs,
+    ):
         if kwargs.get("borderless", None) is None:
             kwargs["borderless"] = True
         if kwargs.get("identifier", None) is None:
             kwargs["identifier"] = "App"
         kwargs["app"] = None
         super().__init__(**kwargs)
+        # app is its own app - shared widget code reaches screen and frame scheduling through self.app
+        self.app = self
 
-        self.terminal = retui.terminal.get_terminal(self)
-        self.brush = Brush(self.terminal.vt_supported)
+        # reuse event objects between input batches, handlers must not keep events they were given
+        self.event_pool = retui.input_handling.EventPool() if event_pool else None
+        if terminal is None:
+            terminal = retui.terminal.get_terminal(self)
+        else:
+            # e.g. HeadlessTerminal created before the app
+            terminal.app = self
+            terminal.event_pool = self.event_pool
+        self.terminal = terminal
+        self.brush = Brush(self.terminal.vt_supported, file=self.terminal.output_file())
+        self.screen = retui.terminal.ScreenBuffer(self.terminal.columns, self.terminal.rows)
         self.debug_colors = TerminalColor()
 
         self.running = False
@@ -61,7 +86,13 @@ class App(retui.widgets.Pane):
 
         self.mouse_lmb_state = 0
 
-        self.column_row_widget_cache = {}
+        self.widget_index = retui.spatial.SpanIndex()
+        # removed widget may leave siblings in place, index is rebuilt anyway
+        self._rebuild_index = False
+        # terminal reports mouse motion without buttons held
+        self._mouse_motion = False
+        # receives key events, set by clicking on a widget
+        self.focused_widget = None
 
         self.demo_thread = None
         self.demo_time_s = None
@@ -69,8 +100,22 @@ class App(retui.widgets.Pane):
         self.emulate_screen_dimensions = None
         self.debug = debug
 
+        # render scheduler - invalidations are coalesced into at most one frame per 1/max_fps
+        # screen areas to repaint in next frame, e.g. left by moved or removed widgets
+        self.damage = []
+        self.max_fps = max_fps
+        self._frame_pending = False
+        self._frame_event = None
+        self._last_frame_time = 0.0
+
+        # stylesheets reloaded on change, see watch_stylesheet
+        self.file_watcher = retui.file_watch.FileWatcher()
+
         # asyncio
         self.thread_pool_executor = None
+        self.loop = None
+        self.events = None
+        self.tasks = []
         _log.info("App init done")
 
     @staticmethod
@@ -80,40 +125,64 @@ class App(retui.widgets.Pane):
         if app.demo_event.is_set():
             return
         app.running = False
+        app.wake()
 
     def init_asyncio(self):
         self.thread_pool_executor = concurrent.futures.ThreadPoolExecutor()
 
     def register_tasks(self):
+        """
+        Override to start own coroutines with create_task, called from inside of the event loop
+        """
         pass
 
+    def create_task(self, coro) -> asyncio.Task:
+        """
+        Runs coroutine alongside main loop, task is cancelled when app ends
+        """
+        task = self.loop.create_task(coro)
+        self.tasks.append(task)
+        return task
+
+    def wake(self):
+        """
+        Wakes main loop waiting for events, safe to call from other threads and signal handlers
+        """
+        if self.loop is not None and self.events is not None:
+            self.loop.call_soon_threadsafe(self.events.put_nowait, None)
+
     def debug_print(self, text, end="\n", row_off=-1):
         if self.debug:
             _log.debug(text)
-            # TODO
             row = (0 if row_off >= 0 else self.terminal.rows) + row_off
-            self.brush.move_cursor(row=row)
-            self.brush.print(text, end=end, color=self.debug_colors)
+            # through screen buffer, so front buffer keeps matching what is on terminal
+            line = str(text).replace("\n", " ")
+            self.screen.put(0, row, line.ljust(self.screen.width), self.debug_colors)
+            self.request_frame()
 
     def clear(self, reuse=True):
         self.dimensions.width, self.dimensions.height = self.terminal.update_size()
-        if reuse:
-            self.brush.move_cursor(0, 0)
-        for line in retui.terminal.TerminalBuffer.get_buffer(
-            self.terminal.columns, self.terminal.rows, " ", debug=False
-        ):
-            self.brush.print(line, end="\n")
+        with self.brush.frame():
+            if reuse:
+                self.brush.move_cursor(0, 0)
+            for line in retui.terminal.TerminalBuffer.get_buffer(
+                self.terminal.columns, self.terminal.rows, " ", debug=False
+            ):
+                self.brush.print(line, end="\n")
+        # screen is blank now, so are both buffers
+        self.screen.resize(self.terminal.columns, self.terminal.rows)
         self._update_size = True
+        self.request_frame()
 
     def handle_click(self, event: retui.input_handling.MouseEvent):
-        # naive cache - based on clicked point
-        # pro - we can create heat map
-        # cons - it would be better with rectangle
-        widget = self.column_row_widget_cache.get(event.coordinates, 1)
-        if isinstance(widget, int):
-            widget = self.get_widget(event.coordinates[0], event.coordinates[1])
-            self.column_row_widget_cache[event.coordinates] = widget
+        # index is rebuilt with every layout change
+        widget = self.widget_index.get(event.coordinates[0], event.coordinates[1])
         if widget:
+            if event.hover:
+                if event.button == event.button.NONE and not widget.hover_events:
+                    return widget
+            elif event.pressed and event.button in (event.button.LMB, event.button.RMB, event.button.MIDDLE):
+                self.focused_widget = widget
             widget.handle(event)
 
         return widget
@@ -123,9 +192,6 @@ class App(retui.widgets.Pane):
         ctx.handle_events(events_list)
 
     def handle_events(self, events_list):
-        off = -2
-        col = 0
-        # with -1 - 2 lines nearest end of screen overwrite each other
         for event in events_list:
             if isinstance(event, deque):
                 self.handle_events(event)
@@ -142,7 +208,6 @@ class App(retui.widgets.Pane):
                 #    widget = self.handle_click(event)
                 widget = self.handle_click(event)
 
-                self.brush.move_cursor(row=(self.terminal.rows + off) - 1)
                 if widget:
                     _log.debug(
                         f"x: {event.coordinates[0]} y: {event.coordinates[1]} "
@@ -153,14 +218,13 @@ class App(retui.widgets.Pane):
             elif isinstance(event, retui.terminal.base.SizeChangeEvent):
                 self.clear()
                 self.debug_print(f"size: {self.terminal.columns:3}x{self.terminal.rows:3}", row_off=-2)
-            elif isinstance(event, retui.input_handling.KeyEvent):
+            elif isinstance(event, (retui.input_handling.KeyEvent, retui.input_handling.TextEvent)):
+                if self.focused_widget and self.focused_widget is not self:
+                    self.focused_widget.handle(event)
                 self.debug_print(event, row_off=-3)
             else:
-                self.brush.move_cursor(row=(self.terminal.rows + off), column=col)
                 debug_string = f'type={type(event)} event="{event}", '
-                # col = len(debug_string)
                 self.debug_print(debug_string, row_off=-1)
-                pass
 
     signal_sigint_ctx = None
 
@@ -171,8 +235,7 @@ class App(retui.widgets.Pane):
     def signal_handle(self, signum, frame):
         self.running = False
         _log.debug(f"Signum: {signum}")
-        # TODO: read_events is blocking, so this one needs to be somehow inject, otherwise we wait for first new event
-        # works accidentally - as releasing ctrl-c cause key event ;)
+        self.wake()
 
     def demo_mode(self, time_s):
         self.demo_time_s = time_s
@@ -180,24 +243,166 @@ class App(retui.widgets.Pane):
     def emulate_screen(self, height: int, width: int):
         self.emulate_screen_dimensions = (height, width)
 
+    def request_frame(self):
+        """
+        Schedules a frame, multiple requests before the frame is drawn result in single frame.
+        Safe to call from other threads.
+        """
+        if self._frame_pending:
+            return
+        self._frame_pending = True
+        if self.loop is not None and self._frame_event is not None:
+            self.loop.call_soon_threadsafe(self._frame_event.set)
+
+    def invalidate(self):
+        self._redraw = True
+        self.request_frame()
+
+    # above it damage is merged into single rectangle, tracking it would cost more than repainting
+    damage_limit = 16
+
+    def add_damage(self, rect: Rectangle):
+        if rect.empty():
+            return
+        if len(self.damage) >= self.damage_limit:
+            merged = rect
+            for damaged in self.damage:
+                merged = merged.union(damaged)
+            self.damage = [merged]
+        else:
+            self.damage.append(dataclasses.replace(rect))
+        self.request_frame()
+
+    def paint(self):
+        # app has no background of its own
+        self.screen.fill(self.last_dimensions)
+
+    async def render_loop(self):
+        while self.running:
+            await self._frame_event.wait()
+            self._frame_event.clear()
+            if self.max_fps > 0:
+                delay = self._last_frame_time + (1.0 / self.max_fps) - self.loop.time()
+                if delay > 0:
+                    # invalidations coming in the meantime land in this frame
+                    await asyncio.sleep(delay)
+            self._frame_pending = False
+            self.render_frame()
+            self._last_frame_time = self.loop.time()
+
+    def render_done(self, task: asyncio.Task):
+        # without frames app would keep taking input while screen is frozen, stop it instead
+        if task.cancelled() or task.exception() is None:
+            return
+        _log.error("render loop failed", exc_info=task.exception())
+        self.running = False
+        self.wake()
+
+    def render_frame(self):
+        if self._update_size or self._update_children or self._rebuild_index:
+            self.update_dimensions_dirty()
+        self.draw()
+
     def draw(self, force: bool = False):
-        # TODO evaluate need
-        if force or self._redraw:
-            for widget in self.widgets:
-                widget.draw(force=force)
-            self._redraw = False
-        self.brush.move_cursor(row=self.terminal.rows - 1)
+        # widgets draw into back buffer, only the difference is written to terminal
+        if force:
+            self.screen.invalidate()
+        force = force or self._redraw
+        damage = self.damage
+        self.damage = []
+        if force:
+            # app has no background of its own, wipe what was left by moved or removed widgets
+            self.screen.clear()
+        else:
+            # only widgets intersecting damaged area repaint, and only inside of it
+            for rect in damage:
+                with self.screen.clipped(rect):
+                    self.draw_damaged(rect)
+        self.draw_widgets(force=force)
+        self._redraw = False
+        with self.brush.frame():
+            self.flush()
+            self.brush.move_cursor(row=self.terminal.rows - 1)
+
+    def flush(self):
+        for row, start, end in self.screen.diff():
+            parts = []
+            for text, color in self.screen.spans(row, start, end):
+                # colors carry over between rows, cursor movement does not change them
+                parts.append(self.brush.color(color))
+                parts.append(text)
+            self.brush.move_cursor(row=row, column=start)
+            self.brush.write("".join(parts))
+            self.screen.commit(row, start, end)
+        # leave terminal in default colors for anything written outside of frame
+        self.brush.write(self.brush.color(TerminalColor()))
 
     def update_dimensions(self):
         self._update_size = False
+        self._update_children = False
         # TODO For APP always use current - is this correct assumption?
         self.last_dimensions = self.dimensions_copy(last=False)
         self._inner_dimensions = self.calculate_inner_dimensions()
         self.docked_dimensions = dataclasses.replace(self._inner_dimensions)
+        if self.pending_widgets:
+            self.create_pending_widgets()
         for widget in self.widgets:
             widget.update_dimensions()
+        self.widget_index.rebuild(self)
+        self.update_mouse_tracking()
+        self._rebuild_index = False
         self._redraw = True
 
+    def update_dimensions_dirty(self) -> bool:
+        if self._update_size:
+            self.update_dimensions()
+            return True
+        changed = self._update_children and self.update_children_dimensions_dirty()
+        if changed or self._rebuild_index:
+            self.widget_index.rebuild(self)
+            self.update_mouse_tracking()
+            self._rebuild_index = False
+        return changed
+
+    def widget_removed(self, widget: retui.widgets.TerminalWidget):
+        """
+        Called by pane after removing widget - it must not receive clicks or key events anymore
+        """
+        self._rebuild_index = True
+        focused = self.focused_widget
+        while focused is not None:
+            if focused is widget:
+                self.focused_widget = None
+                break
+            focused = focused.parent
+        self.request_frame()
+
+    def watch_stylesheet(self, file_name, theme: retui.theme.Theme = None):
+        """
+        Loads stylesheet into theme and reloads it whenever the file is saved, while app runs.
+        Only widgets selected by changed rules are drawn again.
+        """
+        theme = retui.theme._APP_THEME if theme is None else theme
+        theme.load_stylesheet(file_name)
+        self.file_watcher.watch(file_name, lambda path: self.reload_stylesheets(theme))
+
+    def reload_stylesheets(self, theme: retui.theme.Theme):
+        try:
+            changed = theme.reload_stylesheets()
+        except Exception as e:
+            # e.g. saved in the middle of editing, keep styling until it parses again
+            _log.error(f"stylesheet not reloaded - {e}")
+            return
+        _log.debug(f"stylesheet reloaded, changed selectors: {changed}")
+        if changed:
+            self.restyle(changed)
+
+    def update_mouse_tracking(self):
+        # any-motion tracking floods input while mouse moves, ask for it only when some widget uses hover
+        if self.widget_index.hover != self._mouse_motion:
+            self._mouse_motion = self.widget_index.hover
+            self.terminal.mouse_tracking(self._mouse_motion)
+
     def run(self) -> int:
         if self.running is True:
             return -1
@@ -233,8 +438,6 @@ class App(retui.widgets.Pane):
         self.brush.cursor_hide()
         self.handle_events([retui.terminal.base.SizeChangeEvent()])
 
-        self.register_tasks()
-
         asyncio.run(self.main_loop())
 
         if self.demo_thread and self.demo_thread.is_alive():
@@ -248,16 +451,38 @@ class App(retui.widgets.Pane):
         return 0
 
     async def main_loop(self):
-        while self.running:
-            if self._update_size:
-                self.column_row_widget_cache.clear()
-                self.update_dimensions()
-            self.draw()
-
-            # this is blocking
-            if not self.terminal.read_events(self.handle_events_callback, self):
-                break
-        # await asyncio.sleep(0.1)
+        self.loop = asyncio.get_running_loop()
+        self.loop.set_default_executor(self.thread_pool_executor)
+        self.events = asyncio.Queue()
+        self._frame_event = asyncio.Event()
+        if self._frame_pending:
+            self._frame_event.set()
+        self.terminal.start_reading(self.loop, self.events)
+        self.file_watcher.start(self.loop)
+        render_task = self.create_task(self.render_loop())
+        render_task.add_done_callback(self.render_done)
+        self.register_tasks()
+        try:
+            while self.running:
+                # input, timers and tasks run concurrently, None just wakes us up
+                events_list = await self.events.get()
+                if events_list:
+                    self.handle_events(events_list)
+                    if self.event_pool:
+                        self.event_pool.release(events_list)
+            if render_task.done() and not render_task.cancelled() and render_task.exception():
+                raise render_task.exception()
+        finally:
+            self.terminal.stop_reading(self.loop)
+            self.file_watcher.stop(self.loop)
+            for task in self.tasks:
+                task.cancel()
+            if self.tasks:
+                await asyncio.gather(*self.tasks, return_exceptions=True)
+            self.tasks.clear()
+            self.events = None
+            self._frame_event = None
+            self.loop = None
 
     def color_mode(self, enable=True) -> bool:
         if enable:
@@ -274,56 +499,136 @@ class App(retui.widgets.Pane):
 
 
 class Brush:
-    def __init__(self, use_color=True):
-        self.file = sys.stdout
+    def __init__(self, use_color=True, file=None):
+        self.file = sys.stdout if file is None else file
         self.console_color = TerminalColor()
         self.use_color = use_color
+        # frame batching - while set everything is accumulated and written once in end_frame
+        self._frame = None
+        self._frame_depth = 0
 
     RESET = "\x1B[0m"
 
     def color_mode(self, enable=True):
         self.use_color = enable
 
+    def begin_frame(self):
+        # frames can nest, only the outermost one writes
+        if self._frame_depth == 0:
+            self._frame = io.StringIO()
+        self._frame_depth += 1
+
+    def end_frame(self):
+        if self._frame_depth == 0:
+            return
+        self._frame_depth -= 1
+        if self._frame_depth > 0:
+            return
+        data = self._frame.getvalue()
+        self._frame = None
+        if data:
+            self._write_frame(data)
+
+    @contextlib.contextmanager
+    def frame(self):
+        self.begin_frame()
+        try:
+            yield self
+        finally:
+            self.end_frame()
+
+    def _write_frame(self, data: str):
+        try:
+            fd = self.file.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            # not backed by a file descriptor e.g. captured output
+            self.file.write(data)
+            self.file.flush()
+            return
+
+        # anything already buffered in file has to go first
+        self.file.flush()
+        encoding = getattr(self.file, "encoding", None) or "utf-8"
+        buffer = memoryview(data.encode(encoding, errors="replace"))
+        while buffer:
+            try:
+                written = os.write(fd, buffer)
+            except BlockingIOError:
+                # stdout can share non-blocking flag with stdin on tty
+                select.select([], [fd], [])
+                continue
+            buffer = buffer[written:]
+
+    def write(self, text: str, flush: bool = False):
+        if self._frame is not None:
+            self._frame.write(text)
+            return
+        self.file.write(text)
+        if flush:
+            self.file.flush()
+
+    # (current foreground, current background, foreground, background) -> SGR switching between them
+    _transitions = {}
+    transitions_limit = 4096
+
+    @staticmethod
+    def sgr_channel(base: int, color: Union[Color, None]) -> str:
+        if color is None or color.none():
+            # 39/49 - default foreground/background
+            return f"{base + 1}"
+        return f"{base};{int(color.bits)};{color.color}"
+
+    @classmethod
+    def transition(cls, current: TerminalColor, target: TerminalColor) -> str:
+        key = (current.foreground, current.background, target.foreground, target.background)
+        sequence = cls._transitions.get(key)
+        if sequence is None:
+            # only channels that differ, defaults restored with 39/49 so RESET is never needed
+            params = []
+            if current.foreground != target.foreground:
+                params.append(cls.sgr_channel(38, target.foreground))
+            if current.background != target.background:
+                params.append(cls.sgr_channel(48, target.background))
+            sequence = f"\x1B[{';'.join(params)}m" if params else ""
+            if len(cls._transitions) >= cls.transitions_limit:
+                cls._transitions.clear()
+            cls._transitions[key] = sequence
+        return sequence
+
     def foreground_color(self, color: Color, check_last=False):
         updated = self.console_color.update_foreground(color)
         if (not updated and check_last) or (self.console_color.foreground is None):
             return ""
-        return f"\x1B[38;{int(self.console_color.foreground.bits)};{self.console_color.foreground.color}m"
+        return f"\x1B[{self.sgr_channel(38, color)}m"
 
     def background_color(self, color: Color, check_last=False):
         updated = self.console_color.update_background(color)
         if (not updated and check_last) or (self.console_color.background is None):
             return ""
-        return f"\x1B[48;{int(self.console_color.background.bits)};{self.console_color.background.color}m"
+        return f"\x1B[{self.sgr_channel(48, color)}m"
 
-    def color(self, console_color: TerminalColor, check_last=False):
-        if self.console_color == console_color:
+    def color(self, console_color: TerminalColor):
+        current = self.console_color
+        if current.foreground == console_color.foreground and current.background == console_color.background:
             return ""
-        ret_val = self.reset_color()
-        ret_val += self.foreground_color(console_color.foreground, check_last)
-        ret_val += self.background_color(console_color.background, check_last)
-        return ret_val
+        sequence = self.transition(current, console_color)
+        current.foreground = console_color.foreground
+        current.background = console_color.background
+        return sequence
 
     def print(self, *args, sep="", end="", color: Union[TerminalColor, None] = None, flush=True):
+        text = sep.join(str(arg) for arg in args)
         if color is None or color.no_color():
-            print(*args, sep=sep, end=end, file=self.file, flush=flush)
+            self.write(text + end, flush=flush)
         else:
-            color = self.color(color)
-            if color != "":
-                print(color, end="", file=self.file)
-            print(*args, sep=sep, end="", file=self.file)
-            print(self.RESET, sep=sep, end=end, file=self.file, flush=flush)
+            self.write(self.color(color) + text + self.RESET + end, flush=flush)
             self.console_color.reset()
 
     def set_foreground(self, color):
-        fg_color = self.foreground_color(color)
-        if fg_color != "":
-            print(fg_color, end="", file=self.file)
+        self.write(self.foreground_color(color))
 
     def set_background(self, color):
-        bg_color = self.background_color(color)
-        if bg_color != "":
-            print(bg_color, end="", file=self.file)
+        self.write(self.background_color(color))
 
     def reset_color(self):
         self.console_color.reset()
@@ -363,19 +668,19 @@ class Brush:
 
     def move_cursor(self, row: int = 0, column: int = 0):
         # 0-based to 1-based
-        print(f"\x1B[{row + 1};{column + 1}H", end="", file=self.file)
+        self.write(f"\x1B[{row + 1};{column + 1}H")
 
     def horizontal_vertical_position(self, row: int = 0, column: int = 0):
         # 0-based to 1-based
-        print(f"\x1B[{row + 1};{column + 1}f", end="", file=self.file)
+        self.write(f"\x1B[{row + 1};{column + 1}f")
 
     def cursor_hide(self):
-        print("\x1b[?25l", end="", file=self.file)
+        self.write("\x1b[?25l")
         # alternative on windows without vt - call to SetConsoleCursorInfo:
         # https://docs.microsoft.com/en-us/windows/console/setconsolecursorinfo?redirectedfrom=MSDN
 
     def cursor_show(self):
-        print("\x1b[?25h", end="", file=self.file)
+        self.write("\x1b[?25h")
 
 
 class Test:
@@ -1,7 +1,7 @@
 from abc import ABC
 from dataclasses import dataclass, field
 from enum import IntEnum
-from typing import List, Tuple, Union
+from typing import List, NamedTuple, Tuple, Union
 
 import retui.enums
 
@@ -12,8 +12,9 @@ class ColorBits(IntEnum):
     BIT_NONE = 0
 
 
-@dataclass
+@dataclass(frozen=True)
 class Color:
+    # immutable, so it can be shared and used as key when caching escape sequences
     color: int
     bits: ColorBits
 
@@ -65,6 +66,27 @@ class Point:
     color: TerminalColor = field(default_factory=TerminalColor.default)
 
 
+class Span(NamedTuple):
+    """
+    Run of text in single color - rows rendered by widgets are lists of spans
+    """
+
+    text: str
+    color: TerminalColor
+
+
+def append_span(spans: List[Span], text: str, color: TerminalColor):
+    # run continuing previous one in same color is merged into it
+    if not text:
+        return
+    if spans:
+        last = spans[-1]
+        if last.color is color or last.color == color:
+            spans[-1] = Span(last.text + text, last.color)
+            return
+    spans.append(Span(text, color))
+
+
 @dataclass
 class Rectangle:
     x: int = 0
@@ -91,22 +113,48 @@ class Rectangle:
         self.width = dimensions[2]
         self.height = dimensions[3]
 
+    def intersection(self, other: "Rectangle") -> "Rectangle":
+        x = max(self.x, other.x)
+        y = max(self.y, other.y)
+        width = max(min(self.x_end(), other.x_end()) - x, 0)
+        height = max(min(self.y_end(), other.y_end()) - y, 0)
+        return Rectangle(x, y, width, height)
+
+    def union(self, other: "Rectangle") -> "Rectangle":
+        """
+        Smallest rectangle covering both
+        """
+        if other.empty():
+            return Rectangle(self.x, self.y, self.width, self.height)
+        if self.empty():
+            return Rectangle(other.x, other.y, other.width, other.height)
+        x = min(self.x, other.x)
+        y = min(self.y, other.y)
+        return Rectangle(x, y, max(self.x_end(), other.x_end()) - x, max(self.y_end(), other.y_end()) - y)
+
+    def empty(self):
+        return self.width <= 0 or self.height <= 0
+
     def contains_point(self, x: int, y: int):
         return not ((self.y > y) or (self.y + self.height - 1 < y) or (self.x > x) or (self.x + self.width - 1 < x))
 
     def translate_coordinates(self, parent):
-        # TODO what if initial position is overflowing?
         self.x += parent.x
         self.y += parent.y
-        # on parent overflow, trim to it size
-        self.width = self.width if self.x_end() <= parent.x_end() else self.width + (parent.x_end() + self.x_end())
-        self.height = self.height if self.y_end() <= parent.y_end() else self.height + (parent.y_end() + self.y_end())
+        # on parent overflow, trim to it size - starting past parent end leaves nothing
+        if self.x_end() > parent.x_end():
+            self.width = max(parent.x_end() - self.x, 0)
+        if self.y_end() > parent.y_end():
+            self.height = max(parent.y_end() - self.y, 0)
 
     def negative(self):
         return self.x < 0 or self.y < 0 or self.width < 0 or self.height < 0
 
 
 class TerminalEvent(ABC):
+    # events are created for every input sequence, no per-instance __dict__
+    __slots__ = ()
+
     def __init__(self):
         pass
 
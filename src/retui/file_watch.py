@@ -0,0 +1,170 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from typing import Callable, Tuple, Union
+
+_log = logging.getLogger(__name__)
+
+# linux/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event - wd, mask, cookie, len, followed by len bytes of name
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def _libc_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        return libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """
+    Calls callback with path of watched file after it was written, from inside of the event loop.
+    Uses inotify on linux, elsewhere or when inotify is not available files are polled for mtime and size.
+    """
+
+    def __init__(self, poll_interval_s: float = 0.5, use_inotify: bool = True):
+        self.poll_interval_s = poll_interval_s
+        self.use_inotify = use_inotify
+        # path -> [callback, (mtime, size) seen last]
+        self.files = {}
+        self.fd = -1
+        # inotify watch descriptor -> directory, editors replace files so directories are watched
+        self.directories = {}
+        self.poll_task = None
+        self._add_watch = None
+        # set while started, watching begins with first watched file
+        self.loop = None
+
+    @staticmethod
+    def stat_key(path: str) -> Union[Tuple[int, int], None]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def watch(self, path: Union[str, os.PathLike], callback: Callable[[str], None]):
+        path = os.path.abspath(path)
+        self.files[path] = [callback, self.stat_key(path)]
+        if self.fd >= 0:
+            self.watch_directory(os.path.dirname(path))
+        elif self.loop is not None and self.poll_task is None:
+            self.start_watching()
+
+    def unwatch(self, path: Union[str, os.PathLike]):
+        self.files.pop(os.path.abspath(path), None)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """
+        Called from inside of the event loop, no inotify descriptor or poll task is used until a file is watched
+        """
+        self.loop = loop
+        if self.files:
+            self.start_watching()
+
+    def start_watching(self):
+        if self.use_inotify and self.start_inotify():
+            self.loop.add_reader(self.fd, self.read_ready)
+        else:
+            self.poll_task = self.loop.create_task(self.poll())
+
+    def stop(self, loop: asyncio.AbstractEventLoop):
+        self.loop = None
+        if self.fd >= 0:
+            loop.remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = -1
+            self.directories.clear()
+        if self.poll_task is not None:
+            self.poll_task.cancel()
+            self.poll_task = None
+
+    def start_inotify(self) -> bool:
+        functions = _libc_inotify()
+        if functions is None:
+            return False
+        inotify_init1, self._add_watch = functions
+        fd = inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            _log.warning(f"inotify_init1 failed - errno: {ctypes.get_errno()}, polling files instead")
+            return False
+        self.fd = fd
+        for directory in {os.path.dirname(path) for path in self.files}:
+            if not self.watch_directory(directory):
+                os.close(self.fd)
+                self.fd = -1
+                self.directories.clear()
+                return False
+        return True
+
+    def watch_directory(self, directory: str) -> bool:
+        if directory in self.directories.values():
+            return True
+        wd = self._add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            _log.warning(f"inotify_add_watch failed for {directory} - errno: {ctypes.get_errno()}")
+            return False
+        self.directories[wd] = directory
+        return True
+
+    def read_ready(self):
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except (BlockingIOError, InterruptedError):
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # events were lost, any file may have changed
+                    changed.update(self.files)
+                elif wd in self.directories:
+                    changed.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+        for path in changed:
+            if path in self.files:
+                self.changed(path, self.stat_key(path))
+
+    async def poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval_s)
+            self.check()
+
+    def check(self):
+        """
+        Compares files with state seen last time, used when polling
+        """
+        for path, entry in list(self.files.items()):
+            key = self.stat_key(path)
+            # missing file is being replaced, wait for it
+            if key is not None and key != entry[1]:
+                self.changed(path, key)
+
+    def changed(self, path: str, key: Union[Tuple[int, int], None]):
+        entry = self.files[path]
+        entry[1] = key
+        try:
+            entry[0](path)
+        except Exception:
+            # watcher runs in event loop, one failing callback must not stop it
+            _log.exception(f"file change callback failed for {path}")
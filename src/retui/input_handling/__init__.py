@@ -1,6 +1,9 @@
+import codecs
+import os
+import re
 import selectors
 from collections import deque
-from enum import Enum, Flag, IntEnum
+from enum import Flag, IntEnum
 
 from retui.base import TerminalEvent
 from retui.input_handling.enums import VirtualKeyCodes
@@ -8,6 +11,8 @@ from retui.input_handling.windows import MOUSE_EVENT_RECORD
 
 
 class MouseEvent(TerminalEvent):
+    __slots__ = ("coordinates", "button", "pressed", "hover", "control_key_state")
+
     last_mask = 0xFFFFFFFF
 
     dwButtonState_to_Buttons = [[0, 0], [1, 2], [2, 1]]
@@ -16,11 +21,15 @@ class MouseEvent(TerminalEvent):
         LMB = 0
         RMB = 2
         MIDDLE = 1
+        # motion without any button held
+        NONE = 3
         WHEEL_UP = 64
         WHEEL_DOWN = 65
 
     class ControlKeys(Flag):
+        LEFT_ALT = 0x2
         LEFT_CTRL = 0x8
+        SHIFT = 0x10
 
     def __init__(self, x, y, button: Buttons, pressed: bool, control_key_state, hover: bool):
         super().__init__()
@@ -32,6 +41,9 @@ class MouseEvent(TerminalEvent):
         # but simplified - right ctrl => left ctrl
         self.control_key_state = control_key_state
 
+    def is_motion(self) -> bool:
+        return self.hover and self.button not in (MouseEvent.Buttons.WHEEL_UP, MouseEvent.Buttons.WHEEL_DOWN)
+
     def __str__(self):
         return (
             f"MouseEvent x: {self.coordinates[0]} y: {self.coordinates[1]} button: {self.button} "
@@ -39,8 +51,16 @@ class MouseEvent(TerminalEvent):
         )
 
     @classmethod
-    def from_windows_event(cls, mouse_event_record: MOUSE_EVENT_RECORD):
+    def from_windows_event(cls, mouse_event_record: MOUSE_EVENT_RECORD, events=None, pool=None):
+        """
+        Translates record into events appended to events list, new list is created if none is given.
+        Returns the list, or None if record produced no events and no list was given.
+        """
         # on windows position is 0-based, top-left corner
+        ret_list = [] if events is None else events
+        new_event = cls if pool is None else pool.mouse_event
+        x = mouse_event_record.dwMousePosition.X
+        y = mouse_event_record.dwMousePosition.Y
 
         hover = False
         # zero indicates mouse button is pressed or released
@@ -49,23 +69,17 @@ class MouseEvent(TerminalEvent):
                 hover = True
             elif mouse_event_record.dwEventFlags == 0x4:
                 # mouse wheel move, high word of dwButtonState is dir, positive up
-                return cls(
-                    mouse_event_record.dwMousePosition.X,
-                    mouse_event_record.dwMousePosition.Y,
-                    MouseEvent.Buttons(MouseEvent.Buttons.WHEEL_UP + ((mouse_event_record.dwButtonState >> 31) & 0x1)),
-                    True,
-                    None,
-                    False,
-                )
+                direction = (mouse_event_record.dwButtonState >> 31) & 0x1
+                button = MouseEvent.Buttons(MouseEvent.Buttons.WHEEL_UP + direction)
+                ret_list.append(new_event(x, y, button, True, None, False))
                 # TODO: high word
+                return ret_list
             elif mouse_event_record.dwEventFlags == 0x8:
                 # horizontal mouse wheel - NOT SUPPORTED
-                return None
+                return events
             elif mouse_event_record.dwEventFlags == 0x2:
                 # double click - TODO: do we need this?
-                return None
-
-        ret_list = []
+                return events
 
         # on Windows we get mask of pressed buttons
         # we can either pass mask around and worry about translating it outside
@@ -74,65 +88,80 @@ class MouseEvent(TerminalEvent):
         changed_mask = mouse_event_record.dwButtonState ^ MouseEvent.last_mask
         if hover:
             changed_mask = mouse_event_record.dwButtonState
+            if changed_mask == 0:
+                # plain move, nothing pressed
+                append_mouse_event(ret_list, new_event(x, y, MouseEvent.Buttons.NONE, False, None, True))
+                return ret_list
 
         if changed_mask == 0:
-            return None
+            return events
 
         MouseEvent.last_mask = mouse_event_record.dwButtonState
 
+        count = len(ret_list)
         for dwButtonState, button in MouseEvent.dwButtonState_to_Buttons:
             changed = changed_mask & (0x1 << dwButtonState)
             if changed:
                 press = mouse_event_record.dwButtonState & (0x1 << dwButtonState) != 0
+                append_mouse_event(ret_list, new_event(x, y, MouseEvent.Buttons(button), press, None, hover))
 
-                event = cls(
-                    mouse_event_record.dwMousePosition.X,
-                    mouse_event_record.dwMousePosition.Y,
-                    MouseEvent.Buttons(button),
-                    press,
-                    None,
-                    hover,
-                )
-                ret_list.append(event)
-
-        if len(ret_list) == 0:
+        if events is None and len(ret_list) == count:
             return None
 
         return ret_list
 
     @classmethod
-    def from_sgr_csi(cls, button_hex: int, x: int, y: int, press: bool):
+    def from_sgr_csi(cls, button_hex: int, x: int, y: int, press: bool, pool=None):
         # print(f"0x{button_hex:X}", file=sys.stderr)
-        move_event = button_hex & 0x20
-        if move_event:
-            # OPT1: don't support move
-            # return None
-            # OPT2: support move like normal click
-            button_hex = button_hex & (0xFFFFFFFF - 0x20)
-            # FINAL: TODO: pass it as Move mouse event and let
-            # button = None
-            # 0x23 on simple move.. with M..
-            # 0x20 on move with lmb
-            # 0x22 on move with rmb
-            # 0x21 on move with wheel
-            if button_hex & 0xF == 0x3:
-                return None
+        # 0x23 on simple move, 0x20 on move with lmb, 0x22 with rmb, 0x21 with wheel
+        move_event = (button_hex & 0x20) != 0
+        button_hex = button_hex & (0xFFFFFFFF - 0x20)
 
         # TODO: wheel_event = button_hex & 0x40
-        ctrl_button = 0x8 if button_hex & 0x10 else 0x0
-
-        # remove ctrl button
-        button_hex = button_hex & (0xFFFFFFFF - 0x10)
-        button = MouseEvent.Buttons(button_hex)
+        # modifiers translated into windows control key state, same as ControlKeys
+        ctrl_button = 0x0
+        if button_hex & 0x4:
+            ctrl_button |= 0x10
+        if button_hex & 0x8:
+            ctrl_button |= 0x2
+        if button_hex & 0x10:
+            ctrl_button |= 0x8
+
+        # remove modifiers
+        button_hex = button_hex & (0xFFFFFFFF - 0x1C)
+        try:
+            button = MouseEvent.Buttons(button_hex)
+        except ValueError:
+            # e.g. extra buttons 8-11, nothing handles them
+            return None
+        if button == MouseEvent.Buttons.NONE:
+            press = False
         # sgr - 1-based
         if y < 2:
             return None
 
         # 1-based - translate to 0-based
-        return cls(x - 1, y - 1, button, press, ctrl_button, False)
+        if pool is not None:
+            return pool.mouse_event(x - 1, y - 1, button, press, ctrl_button, move_event)
+        return cls(x - 1, y - 1, button, press, ctrl_button, move_event)
+
+
+def append_mouse_event(payload, event: MouseEvent):
+    """
+    Appends event to payload, motion replaces motion directly before it - only latest position matters.
+    Presses, releases and wheel break the run, so they are never lost.
+    """
+    if event.is_motion() and payload:
+        last = payload[-1]
+        if isinstance(last, MouseEvent) and last.is_motion() and last.button == event.button:
+            payload[-1] = event
+            return
+    payload.append(event)
 
 
 class KeyEvent(TerminalEvent):
+    __slots__ = ("key_down", "repeat_count", "vk_code", "vs_code", "char", "wchar", "control_key_state")
+
     def __init__(
         self,
         key_down: bool,
@@ -159,36 +188,63 @@ class KeyEvent(TerminalEvent):
         )
 
 
-class InputInterpreter:
-    # linux
-    # lmb 0, rmb 2, middle 1, wheel up 64 + 0, wheel down 64 + 1
+class TextEvent(TerminalEvent):
+    """
+    Run of printable characters that came in single read, e.g. pasted text
+    """
 
-    class State(Enum):
-        DEFAULT = 0
-        ESCAPE = 1
-        CSI_BYTES = 2
+    __slots__ = ("text",)
 
-    # this class should
-    # receive data
-    # and parse it accordingly
-    # if it is ESC then start parsing it as ansi escape code
-    # and emit event once we parse whole sequence
-    # otherwise pass it to... input handler?
+    def __init__(self, text: str):
+        super().__init__()
+        self.text = text
 
-    # better yet:
-    # this class should provide read method, and wrap the input provided
+    def __str__(self):
+        preview = self.text if len(self.text) <= 32 else self.text[:29] + "..."
+        return f"TextEvent: len={len(self.text)} text={preview!r}"
+
+
+class EventPool:
+    """
+    Freelist of mouse and key events reused between input batches.
+    Consumer releases batch once handled - handlers must not keep references to pooled events.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.mouse_events = []
+        self.key_events = []
+
+    def mouse_event(self, x, y, button, pressed: bool, control_key_state, hover: bool) -> MouseEvent:
+        if self.mouse_events:
+            event = self.mouse_events.pop()
+            event.__init__(x, y, button, pressed, control_key_state, hover)
+            return event
+        return MouseEvent(x, y, button, pressed, control_key_state, hover)
+
+    def key_event(self, key_down, repeat_count, vk_code, vs_code, char, wchar, control_key_state) -> KeyEvent:
+        if self.key_events:
+            event = self.key_events.pop()
+            event.__init__(key_down, repeat_count, vk_code, vs_code, char, wchar, control_key_state)
+            return event
+        return KeyEvent(key_down, repeat_count, vk_code, vs_code, char, wchar, control_key_state)
+
+    def release(self, events):
+        for event in events:
+            event_type = type(event)
+            if event_type is MouseEvent:
+                if len(self.mouse_events) < self.max_size:
+                    self.mouse_events.append(event)
+            elif event_type is KeyEvent:
+                if len(self.key_events) < self.max_size:
+                    self.key_events.append(event)
+            elif event_type is list or event_type is deque:
+                self.release(event)
 
-    def __init__(self, readable_input):
-        self.input = readable_input
-        self.state = self.State.DEFAULT
-        self.input_raw = []
-        self.ansi_escape_sequence = []
-        self.payload = deque()
-        self.last_button_state = [0, 0, 0]
-        self.selector = selectors.DefaultSelector()
-        self.selector.register(self.input, selectors.EVENT_READ)
-        self.selector_timeout_s = 1.0
-        self.read_count = 64
+
+class InputInterpreter:
+    # linux
+    # lmb 0, rmb 2, middle 1, wheel up 64 + 0, wheel down 64 + 1
 
     # 9 Normal \x1B[ CbCxCy M , value + 32 -> ! is 1 - max 223 (255 - 32)
     # 1006 SGR  \x1B[<Pb;Px;Py[Mm] M - press m - release
@@ -196,195 +252,183 @@ class InputInterpreter:
     # 1016 SGR-Pixel x,y are pixels instead of cells
     # https://invisible-island.net/xterm/ctlseqs/ctlseqs.html
 
-    def parse(self):
-        # ConsoleView.log(f'parse: {self.ansi_escape_sequence}')
-        # should append to self.event_list
-        length = len(self.ansi_escape_sequence)
-
-        if length < 3:
-            # minimal sequence is ESC [ (byte in range 0x40-0x7e)
-            self.payload.append(str(self.ansi_escape_sequence))
-            return
-
-        # we can safely skip first 2 bytes
-        if self.ansi_escape_sequence[2] == "<":
-            # for mouse last byte will be m or M character
-            if self.ansi_escape_sequence[-1] not in ("m", "M"):
-                self.payload.append(str(self.ansi_escape_sequence))
-                return
-            # SGR
-            idx = 0
-            values = [0, 0, 0]
-            temp_word = ""
-            press = False
-            for i in range(3, length + 1):
-                ch = self.ansi_escape_sequence[i]
-                if idx < 2:
-                    if ch == ";":
-                        values[idx] = int(temp_word, 10)
-                        idx += 1
-                        temp_word = ""
-                        continue
-                elif ch in ("m", "M"):
-                    values[idx] = int(temp_word, 10)
-                    if ch == "M":
-                        press = True
-                    break
-                temp_word += ch
-            # msft
-            # lmb 0x1 rmb 0x2, lmb2 0x4 lmb3 0x8 lmb4 0x10
-            # linux
-            # lmb 0, rmb 2, middle 1, wheel up 64 + 0, wheel down 64 + 1
-            # move 32 + key
-            # shift   4
-            # meta    8
-            # control 16
-            # print(f"0X{values[0]:X} 0X{values[1]:X} 0x{values[2]:X}, press={press}", file=sys.stderr)
-            mouse_event = MouseEvent.from_sgr_csi(values[0], values[1], values[2], press)
-            if mouse_event:
-                self.payload.append(mouse_event)
-            return
-
-        # normal - TODO
-        # self.payload.extend(str(self.ansi_escape_sequence))
-        len_aes = len(self.ansi_escape_sequence)
-        if len_aes == 3:
-            third_char = ord(self.ansi_escape_sequence[2])
-            vk_code = 0
-            char = b"\x00"
-            wchar = ""
-            if third_char == 65:
-                # A - Cursor Up
-                vk_code = VirtualKeyCodes.VK_UP
-            elif third_char == 66:
-                # B - Cursor Down
-                vk_code = VirtualKeyCodes.VK_DOWN
-            elif third_char == 67:
-                # C - Cursor Right
-                vk_code = VirtualKeyCodes.VK_RIGHT
-            elif third_char == 68:
-                # D - Cursor Left
-                vk_code = VirtualKeyCodes.VK_LEFT
-            else:
-                self.payload.append(str(self.input_raw))
-                return
-            self.payload.append(
-                KeyEvent(
-                    key_down=True,
-                    repeat_count=1,
-                    vk_code=vk_code,
-                    vs_code=vk_code,
-                    char=char,
-                    wchar=wchar,
-                    control_key_state=0,
-                )
-            )
-        elif len_aes == 4:
-            # 1 ~ Home
-            # 2 ~ Insert
-            # 3 ~ Delete
-            # 4 ~ End
-            # 5 ~ PageUp
-            # 6 ~ PageDown
-            pass
-        elif len_aes == 5:
-            # 1 1 ~ F1
-            # ....
-            # 1 5 ~ F5
-            # 1 7 ~ F6
-            # 1 8 ~ F7
-            # 1 9 ~ F8
-            # 2 0 ~ F9
-            # 2 1 ~ F10
-            # 2 3 ~ F11
-            # 2 3 ~ F12
-            pass
-
-        self.payload.append(str(self.input_raw))
-        return
-
-    def parse_keyboard(self):
-        if len(self.input_raw) > 1:
-            # skip for now
-            self.payload.append(str(self.input_raw))
-            return
-        wchar = self.input_raw[0]
-        if wchar.isprintable() is False:
-            # skip for now
-            self.payload.append(str(self.input_raw))
-            return
-        # https://docs.microsoft.com/en-us/windows/win32/inputdev/virtual-key-codes
-        # key a is for both upper and lower case
-        # vk_code = wchar.lower()
-        self.payload.append(
-            KeyEvent(
-                key_down=True,
-                repeat_count=1,
-                vk_code=VirtualKeyCodes.from_ascii(ord(wchar)),
-                vs_code=ord(wchar),
-                char=wchar.encode(),
-                wchar=wchar,
-                control_key_state=0,
-            )
+    # ESC [ followed by any number in range 0x30-0x3f, then any between 0x20-0x2f, and final byte 0x40-0x7e
+    TOKEN_RE = re.compile(
+        r"\x1b\[<(\d+);(\d+);(\d+)([Mm])"  # SGR mouse
+        r"|\x1b\[([0-?]*)[ -/]*([@-~])"  # other CSI
+        r"|(\x1b)(?!\[)"  # ESC not starting CSI
+        r"|([^\x00-\x1f\x7f]+)"  # printable run
+        r"|([\x00-\x1f\x7f])",  # control character
+        re.DOTALL,
+    )
+    # sequence cut in half by read - wait for the rest
+    PARTIAL_RE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*)?\Z")
+
+    # ESC [ final
+    csi_keys = {
+        "A": VirtualKeyCodes.VK_UP,
+        "B": VirtualKeyCodes.VK_DOWN,
+        "C": VirtualKeyCodes.VK_RIGHT,
+        "D": VirtualKeyCodes.VK_LEFT,
+    }
+
+    # ESC [ n ~
+    tilde_keys = {
+        "1": VirtualKeyCodes.VK_HOME,
+        "2": VirtualKeyCodes.VK_INSERT,
+        "3": VirtualKeyCodes.VK_DELETE,
+        "4": VirtualKeyCodes.VK_END,
+        "5": VirtualKeyCodes.VK_PRIOR,
+        "6": VirtualKeyCodes.VK_NEXT,
+    }
+
+    control_keys = {
+        "\r": VirtualKeyCodes.VK_RETURN,
+        "\n": VirtualKeyCodes.VK_RETURN,
+        "\t": VirtualKeyCodes.VK_TAB,
+        "\x08": VirtualKeyCodes.VK_BACK,
+        "\x7f": VirtualKeyCodes.VK_BACK,
+        "\x1b": VirtualKeyCodes.VK_ESCAPE,
+    }
+
+    def __init__(self, readable_input, pool: EventPool = None):
+        self.input = readable_input
+        self.pool = pool
+        self.fd = readable_input.fileno()
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        # undecoded tail of previous read - incomplete escape sequence
+        self.pending = ""
+        self.payload = deque()
+        self.last_button_state = [0, 0, 0]
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.input, selectors.EVENT_READ)
+        self.selector_timeout_s = 1.0
+        self.read_count = 4096
+        # rest is left in stdin and picked up by next read, so paste won't create arbitrary size buffer
+        self.read_limit = 65536
+
+    def key_event(self, vk_code: int, char=b"\x00", wchar: str = "", vs_code=None) -> KeyEvent:
+        new_event = KeyEvent if self.pool is None else self.pool.key_event
+        return new_event(
+            key_down=True,
+            repeat_count=1,
+            vk_code=vk_code,
+            vs_code=vk_code if vs_code is None else vs_code,
+            char=char,
+            wchar=wchar,
+            control_key_state=0,
         )
-        return
 
     def read(self, count: int = 1):
-        # ESC [ followed by any number in range 0x30-0x3f, then any between 0x20-0x2f, and final byte 0x40-0x7e
-        # TODO: this should be limited so if one pastes long, long text this wont create arbitrary size buffer
         ready = self.selector.select(self.selector_timeout_s)
         if not ready:
             return None
 
-        ch = self.input.read(self.read_count)
-        while ch is not None and len(ch) > 0:
-            self.input_raw.extend(ch)
-            ch = self.input.read(self.read_count)
-
-        if len(self.input_raw) > 0:
-            for i in range(0, len(self.input_raw)):
-                ch = self.input_raw[i]
-                if self.state != self.State.DEFAULT:
-                    ord_ch = ord(ch)
-                    if 0x20 <= ord_ch <= 0x7F:
-                        if self.state == self.State.ESCAPE:
-                            if ch == "[":
-                                self.ansi_escape_sequence.append(ch)
-                                self.state = self.State.CSI_BYTES
-                                continue
-                        elif self.state == self.State.CSI_BYTES:
-                            if 0x30 <= ord_ch <= 0x3F:
-                                self.ansi_escape_sequence.append(ch)
-                                continue
-                            elif 0x40 <= ord_ch <= 0x7E:
-                                # implicit IntermediateBytes
-                                self.ansi_escape_sequence.append(ch)
-                                self.parse()
-                                self.state = self.State.DEFAULT
-                                continue
-                    # parse what we had collected so far, since we failed check above
-                    self.parse()
-                    self.state = self.State.DEFAULT
-                    # intentionally fall through to regular parse
-                # check if escape code
-                if ch == "\x1B":
-                    self.ansi_escape_sequence.clear()
-                    self.ansi_escape_sequence.append(ch)
-                    self.state = self.State.ESCAPE
-                    continue
-
-                # pass input to handler
-                # here goes key, but what about ctrl, shift etc.? these are regular AsciiChar equivalents
-                # no key up, only key down, is there \x sequence to enable extended? should be imho
-                self.parse_keyboard()
-                pass
-            # DEBUG - don't do "".join, as the sequences are not printable
-            # self.payload.append(str(self.input_raw))
-            self.input_raw.clear()
-
-            if len(self.payload) > 0:
-                payload = self.payload
-                self.payload = deque()
-                return payload
+        return self.read_ready()
+
+    def read_raw(self) -> str:
+        chunks = []
+        total = 0
+        while total < self.read_limit:
+            try:
+                chunk = os.read(self.fd, self.read_count)
+            except (BlockingIOError, InterruptedError):
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+            total += len(chunk)
+            if len(chunk) < self.read_count:
+                break
+        return self.decoder.decode(b"".join(chunks))
+
+    def read_ready(self):
+        # call only when input is ready, e.g. from event loop reader callback
+        data = self.read_raw()
+        if not data:
+            return None
+        self.feed(data)
+
+        if self.pending == "\x1b" and not self.selector.select(0):
+            # nothing follows, so it was Escape key not a start of sequence
+            self.pending = ""
+            self.payload.append(self.key_event(VirtualKeyCodes.VK_ESCAPE))
+
+        if len(self.payload) > 0:
+            payload = self.payload
+            self.payload = deque()
+            return payload
 
         return None
+
+    def feed(self, data: str):
+        """
+        Splits input into escape sequences and text runs, appends events to payload
+        """
+        if self.pending:
+            data = self.pending + data
+            self.pending = ""
+
+        payload = self.payload
+        pos = 0
+        end = len(data)
+        while pos < end:
+            # every character matches one of alternatives
+            match = self.TOKEN_RE.match(data, pos)
+            if match.lastindex >= 7 and self.PARTIAL_RE.match(data, pos):
+                # escape sequence cut by read - keep it for next one
+                self.pending = data[pos:]
+                return
+            pos = match.end()
+            last = match.lastindex
+            if last == 4:
+                # msft
+                # lmb 0x1 rmb 0x2, lmb2 0x4 lmb3 0x8 lmb4 0x10
+                # linux
+                # lmb 0, rmb 2, middle 1, wheel up 64 + 0, wheel down 64 + 1
+                # move 32 + key
+                # shift   4
+                # meta    8
+                # control 16
+                mouse_event = MouseEvent.from_sgr_csi(
+                    int(match.group(1)),
+                    int(match.group(2)),
+                    int(match.group(3)),
+                    match.group(4) == "M",
+                    self.pool,
+                )
+                if mouse_event:
+                    append_mouse_event(payload, mouse_event)
+            elif last == 6:
+                params = match.group(5)
+                final = match.group(6)
+                vk_code = None
+                if params == "":
+                    vk_code = self.csi_keys.get(final)
+                elif final == "~":
+                    vk_code = self.tilde_keys.get(params)
+                if vk_code:
+                    payload.append(self.key_event(vk_code))
+                else:
+                    # unsupported - pass it for debug
+                    payload.append(repr(match.group(0)))
+            elif last == 7:
+                payload.append(self.key_event(VirtualKeyCodes.VK_ESCAPE))
+            elif last == 8:
+                text = match.group(8)
+                if len(text) == 1:
+                    # https://docs.microsoft.com/en-us/windows/win32/inputdev/virtual-key-codes
+                    # key a is for both upper and lower case
+                    payload.append(
+                        self.key_event(VirtualKeyCodes.from_ascii(ord(text)), text.encode(), text, ord(text))
+                    )
+                else:
+                    # typed faster than we read or pasted - single event instead of event per character
+                    payload.append(TextEvent(text))
+            else:
+                ch = match.group(9)
+                vk_code = self.control_keys.get(ch)
+                if vk_code:
+                    payload.append(self.key_event(vk_code, ch.encode(), ch))
+                else:
+                    payload.append(repr(ch))
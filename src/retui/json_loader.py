@@ -1,12 +1,24 @@
+import hashlib
 import json
+import logging
+import os
+import pickle  # nosec B403 - cache is written by the loader next to the layout it trusts anyway
+from typing import NamedTuple, Union
 
 import retui
 import retui.mapping
 import retui.widgets
 from retui.base import Color, ColorBits, TerminalColor, json_convert
 
+_log = logging.getLogger(__name__)
+
 FUNCTION_THIS_ARG = "##this"
 KEY_POST_CALLBACKS = "post_callbacks"
+LAYOUT_CACHE_SUFFIX = ".cache"
+# bump when CompiledLayout changes
+LAYOUT_CACHE_FORMAT = 1
+# values given as names in json
+ENUM_KEYS = ("dimensions", "dock", "text_align", "text_wrap")
 
 
 def _register_app_dict(name, app_dict):
@@ -19,14 +31,15 @@ def _callback_wrapper(function, *args):
     function(*args)
 
 
-def _post_callback(this_json, this):
-    post_callbacks = this_json.get(KEY_POST_CALLBACKS)
+def _post_callback(post_callbacks, this):
     if post_callbacks:
         for callback in post_callbacks:
             print(callback)
-            for key, value in callback.items():
-                if retui.mapping.is_mapping(value):
-                    callback[key] = retui.mapping.get_mapping(value)
+            # resolved into copy, compiled layout can be built again
+            callback = {
+                key: retui.mapping.get_mapping(value) if retui.mapping.is_mapping(value) else value
+                for key, value in callback.items()
+            }
 
             fun = callback.get("function", None)
             args = None
@@ -58,6 +71,257 @@ def dict_value_convert(key, dictionary):
         dictionary[key] = param
 
 
+class CompiledWidget(NamedTuple):
+    widget_class: type
+    # constructor arguments without app, values of mapped_keys are still "__dict#name" mappings
+    kwargs: dict
+    mapped_keys: tuple
+    # index of parent in CompiledLayout.widgets, -1 - app
+    parent: int
+    post_callbacks: Union[list, None]
+
+
+class CompiledLayout(NamedTuple):
+    """
+    Layout with widget classes, enums and parent links resolved, only app dict mappings are left for build_app
+    """
+
+    title: str
+    color: bool
+    widgets: tuple
+    post_callbacks: Union[list, None]
+    # path -> sha256 of layout file and included files
+    sources: dict
+
+
+class WidgetSpec:
+    """
+    Widget parsed from json, constructed when parent pane is laid out for the first time
+    """
+
+    __slots__ = ("widget_class", "kwargs", "post_callbacks", "children")
+
+    def __init__(self, widget_class, kwargs: dict, post_callbacks=None):
+        self.widget_class = widget_class
+        self.kwargs = kwargs
+        self.post_callbacks = post_callbacks
+        self.children = []
+
+    def create(self):
+        widget = self.widget_class.from_dict(**self.kwargs)
+        for child in self.children:
+            widget.add_widget_spec(child)
+        _post_callback(self.post_callbacks, widget)
+        return widget
+
+    def find(self, identifier: str) -> bool:
+        if self.kwargs.get("identifier") == identifier:
+            return True
+        return any(child.find(identifier) for child in self.children)
+
+
+def _read_json(path: str, encoding: str, sources: dict):
+    with open(path, "rb") as f:
+        data = f.read()
+    sources[path] = hashlib.sha256(data).hexdigest()
+    return json.loads(data.decode(encoding))
+
+
+def _widget_entries(widgets: list, path: str, encoding: str, sources: dict, parent_id=None, including=()) -> list:
+    """
+    Returns widget entries with {"include": "file.json"} entries replaced by widgets of included file.
+    Include path is relative to including file, top level widgets of it get parent_id of include entry.
+    """
+    entries = []
+    for widget_json in widgets:
+        if widget_json.get("ignore", False):
+            continue
+        widget_parent_id = widget_json.get("parent_id", parent_id)
+        include = widget_json.get("include")
+        if include is not None:
+            include_path = os.path.abspath(os.path.join(os.path.dirname(path), include))
+            if include_path in including or include_path == path:
+                raise Exception(f"Include cycle: {' -> '.join(including + (path, include_path))}")
+            included = _read_json(include_path, encoding, sources)
+            if isinstance(included, dict):
+                included = included["widgets"]
+            entries.extend(
+                _widget_entries(included, include_path, encoding, sources, widget_parent_id, including + (path,))
+            )
+            continue
+        if widget_parent_id is not None:
+            widget_json["parent_id"] = widget_parent_id
+        entries.append(widget_json)
+    return entries
+
+
+def _widget_class(widget_type, widget_json: dict, ctx_globals):
+    if retui.mapping.is_mapping(widget_type):
+        widget_type = retui.mapping.get_mapping(widget_type)
+    if isinstance(widget_type, str):
+        widget_class = retui.mapping.get_widget_class(widget_type)
+        if widget_class is None:
+            widget_class = retui.mapping.import_widget_class(widget_type, ctx_globals)
+            if widget_class is None:
+                raise Exception(f"Unknown widget type: '{widget_type}'")
+        return widget_class
+    if isinstance(widget_type, type) and issubclass(widget_type, retui.widgets.TerminalWidget):
+        return widget_type
+    raise Exception(f"widget[{widget_json.get('id')}] is of type: {type(widget_type)}")
+
+
+def _compile_widget(widget_json: dict, ctx_globals):
+    """
+    Resolves widget class and converts entry into its constructor arguments, app dict mappings are left as they are
+    """
+    widget_class = _widget_class(widget_json.pop("type", None), widget_json, ctx_globals)
+    post_callbacks = widget_json.pop(KEY_POST_CALLBACKS, None)
+
+    if "border_color" in widget_json:
+        fg_color = Color(
+            widget_json["border_color"]["fg"]["val"], ColorBits[widget_json["border_color"]["fg"]["color_bits"]]
+        )
+        bg_color = Color(
+            widget_json["border_color"]["bg"]["val"], ColorBits[widget_json["border_color"]["bg"]["color_bits"]]
+        )
+        widget_json["border_color"] = TerminalColor(fg_color, bg_color)
+
+    widget_id = widget_json.pop("id", None)
+    if widget_id:
+        widget_json["identifier"] = widget_id
+
+    parent_id = widget_json.pop("parent_id", None)
+
+    # single pass over entry, it runs for every widget of the layout
+    mapped_keys = []
+    for key, value in list(widget_json.items()):
+        if key.startswith("_"):
+            del widget_json[key]
+        elif retui.mapping.is_mapping(value):
+            mapped_keys.append(key)
+        elif key in ENUM_KEYS:
+            dict_value_convert(key, widget_json)
+    return widget_class, widget_id, parent_id, tuple(mapped_keys), post_callbacks
+
+
+def compile_layout(filename, ctx_globals=None, encoding: str = "UTF-8") -> CompiledLayout:
+    path = os.path.abspath(filename)
+    sources = {}
+    app_json = _read_json(path, encoding, sources)
+    entries = _widget_entries(app_json["widgets"], path, encoding, sources)
+
+    title = app_json["name"]
+    if "title" in app_json:
+        if len(app_json["title"]) > 0:
+            title = app_json["title"]
+
+    widgets = []
+    index_by_id = {}
+    for widget_json in entries:
+        widget_class, widget_id, parent_id, mapped_keys, post_callbacks = _compile_widget(widget_json, ctx_globals)
+        parent = -1
+        if parent_id:
+            parent = index_by_id.get(parent_id, None)
+            if parent is None:
+                raise Exception(f"Given parent_id: '{parent_id}' doesnt match already defined id of widget")
+        if widget_id:
+            index_by_id[widget_id] = len(widgets)
+        widgets.append(CompiledWidget(widget_class, widget_json, mapped_keys, parent, post_callbacks))
+
+    return CompiledLayout(
+        title=title,
+        color=app_json.get("color", True),
+        widgets=tuple(widgets),
+        post_callbacks=app_json.get(KEY_POST_CALLBACKS),
+        sources=sources,
+    )
+
+
+def _sources_unchanged(sources: dict) -> bool:
+    for path, digest in sources.items():
+        try:
+            with open(path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() != digest:
+                    return False
+        except OSError:
+            return False
+    return True
+
+
+def load_layout(filename, ctx_globals=None, encoding: str = "UTF-8", cache: bool = True) -> CompiledLayout:
+    """
+    Returns compiled layout, from cache stored next to the file if neither it nor included files changed
+    """
+    cache_name = os.fspath(filename) + LAYOUT_CACHE_SUFFIX
+    if cache:
+        try:
+            with open(cache_name, "rb") as f:
+                cache_format, layout = pickle.loads(f.read())  # nosec B301 - written by compile below
+            if cache_format == LAYOUT_CACHE_FORMAT and _sources_unchanged(layout.sources):
+                return layout
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            # e.g. widget class moved to other module
+            _log.debug(f"layout cache not used - {cache_name}: {e}")
+
+    layout = compile_layout(filename, ctx_globals, encoding)
+
+    if cache:
+        # written aside and moved, so concurrently starting app never reads half of it
+        temp_name = f"{cache_name}.{os.getpid()}"
+        try:
+            with open(temp_name, "wb") as f:
+                f.write(pickle.dumps((LAYOUT_CACHE_FORMAT, layout)))
+            os.replace(temp_name, cache_name)
+        except (OSError, pickle.PicklingError, AttributeError, TypeError) as e:
+            # e.g. read only directory, or class defined in function
+            _log.debug(f"layout cache not stored - {cache_name}: {e}")
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+    return layout
+
+
+def build_app(layout: CompiledLayout, debug: bool = False, terminal=None, lazy: bool = False):
+    """
+    Creates App from compiled layout.
+    With lazy, widgets are constructed on first layout of their parent, children of panes that end up with empty
+    inner area are not constructed at all. Their post_callbacks run when they are constructed.
+    """
+    app = retui.App(debug=debug, terminal=terminal)
+    app.title = layout.title
+    app.color_mode(layout.color)
+
+    # widget or spec of every entry, parent links point here
+    built = []
+    for compiled in layout.widgets:
+        kwargs = dict(compiled.kwargs)
+        for key in compiled.mapped_keys:
+            kwargs[key] = retui.mapping.get_mapping(kwargs[key])
+            if key in ENUM_KEYS:
+                dict_value_convert(key, kwargs)
+        kwargs["app"] = app
+        parent = app if compiled.parent < 0 else built[compiled.parent]
+
+        if lazy:
+            spec = WidgetSpec(compiled.widget_class, kwargs, compiled.post_callbacks)
+            if parent is app:
+                app.add_widget_spec(spec)
+            else:
+                parent.children.append(spec)
+            built.append(spec)
+            continue
+
+        # dimensionsFlag is a string failure
+        widget = compiled.widget_class.from_dict(**kwargs)
+        parent.add_widget(widget)
+        _post_callback(compiled.post_callbacks, widget)
+        built.append(widget)
+
+    _post_callback(layout.post_callbacks, app)
+    return app
+
+
 def app_from_json(
     filename,
     ctx_globals=None,
@@ -65,83 +329,19 @@ def app_from_json(
     app_dict=None,
     debug: bool = False,
     encoding: str = "UTF-8",
+    terminal=None,
+    lazy: bool = False,
+    cache: bool = True,
 ):
+    """
+    Creates App from json layout.
+
+    Widget entry can be {"include": "file.json", "parent_id": ...} - widgets of that file are loaded in its place.
+    Compiled layout is cached in file next to it, and used while layout and included files stay the same.
+    See build_app for lazy.
+    """
     if app_dict_name and app_dict:
         _register_app_dict(app_dict_name, app_dict)
 
-    with open(filename, "r", encoding=encoding) as f:
-        app_json = json.load(f)
-
-        app = retui.App(debug=debug)
-        title = app_json["name"]
-        if "title" in app_json:
-            if len(app_json["title"]) > 0:
-                title = app_json["title"]
-
-        app.title = title
-        app.color_mode(app_json.get("color", True))
-
-        widget_id_dict = {}
-
-        # widgets
-        for widget_json in app_json["widgets"]:
-            if widget_json.get("ignore", False):
-                continue
-            # mapping app dict values
-            for key, value in widget_json.items():
-                if retui.mapping.is_mapping(value):
-                    widget_json[key] = retui.mapping.get_mapping(value)
-
-            widget_type = widget_json.pop("type", None)
-            if isinstance(widget_type, str):
-                widget_class = retui.mapping.get_widget_class(widget_type)
-                if widget_class is None:
-                    widget_class = retui.mapping.import_widget_class(widget_type, ctx_globals)
-                    if widget_class is None:
-                        raise Exception(f"Unknown widget type: '{widget_type}'")
-            elif issubclass(type(widget_type), retui.widgets.TerminalWidget):
-                widget_class = widget_type
-            else:
-                raise Exception(f"widget[{widget_json['id']}] is of type: {type(widget_type)}")
-
-            widget_json["app"] = app
-
-            if "border_color" in widget_json:
-                fg_color = Color(
-                    widget_json["border_color"]["fg"]["val"], ColorBits[widget_json["border_color"]["fg"]["color_bits"]]
-                )
-                bg_color = Color(
-                    widget_json["border_color"]["bg"]["val"], ColorBits[widget_json["border_color"]["bg"]["color_bits"]]
-                )
-                widget_json["border_color"] = TerminalColor(fg_color, bg_color)
-
-            for key in list(widget_json.keys()):
-                if key.startswith("_"):
-                    widget_json.pop(key, None)
-
-            widget_id = widget_json.pop("id", None)
-            if widget_id:
-                widget_json["identifier"] = widget_id
-
-            parent_id = widget_json.pop("parent_id", None)
-            if parent_id:
-                parent = widget_id_dict.get(parent_id, None)
-                if parent is None:
-                    raise Exception(f"Given parent_id: '{parent_id}' doesnt match already defined id of widget")
-            else:
-                parent = app
-
-            dict_value_convert("dimensions", widget_json)
-            dict_value_convert("dock", widget_json)
-
-            # dimensionsFlag is a string failure
-            widget = widget_class.from_dict(**widget_json)
-
-            if widget_id:
-                widget_id_dict[widget_id] = widget
-
-            parent.add_widget(widget)
-            _post_callback(widget_json, widget)
-
-        _post_callback(app_json, app)
-        return app
+    layout = load_layout(filename, ctx_globals, encoding, cache)
+    return build_app(layout, debug=debug, terminal=terminal, lazy=lazy)
@@ -0,0 +1,83 @@
+from bisect import bisect_left, bisect_right
+from typing import Union
+
+from retui.base import Rectangle
+
+
+class SpanIndex:
+    """
+    Hit-test index - for every row keeps sorted, non-overlapping spans [start, end)
+    each pointing to the top-most widget covering it.
+    Memory is bounded by rows * widgets, lookup is a bisect in single row.
+    """
+
+    def __init__(self):
+        # row -> [starts, ends, widgets]
+        self.rows = {}
+        # some indexed widget wants mouse motion without buttons
+        self.hover = False
+
+    def clear(self):
+        self.rows.clear()
+        self.hover = False
+
+    def add(self, rect: Rectangle, widget):
+        """
+        Paints rect on top of whatever was added before
+        """
+        if rect.empty():
+            return
+        start = rect.x
+        end = rect.x_end()
+        for row in range(rect.y, rect.y_end()):
+            spans = self.rows.get(row)
+            if spans is None:
+                self.rows[row] = [[start], [end], [widget]]
+                continue
+            starts, ends, widgets = spans
+            # spans [i, j) overlap painted one
+            i = bisect_right(ends, start)
+            j = bisect_left(starts, end)
+            new_starts = [start]
+            new_ends = [end]
+            new_widgets = [widget]
+            if i < j:
+                if starts[i] < start:
+                    new_starts.insert(0, starts[i])
+                    new_ends.insert(0, start)
+                    new_widgets.insert(0, widgets[i])
+                if ends[j - 1] > end:
+                    new_starts.append(end)
+                    new_ends.append(ends[j - 1])
+                    new_widgets.append(widgets[j - 1])
+            starts[i:j] = new_starts
+            ends[i:j] = new_ends
+            widgets[i:j] = new_widgets
+
+    def get(self, column: int, row: int):
+        spans = self.rows.get(row)
+        if spans is None:
+            return None
+        starts, ends, widgets = spans
+        idx = bisect_right(starts, column) - 1
+        if idx >= 0 and column < ends[idx]:
+            return widgets[idx]
+        return None
+
+    def rebuild(self, root):
+        """
+        Indexes widget tree in draw order - children cover parent, later siblings cover earlier ones,
+        and child is clipped to its parent, same as Pane.get_widget
+        """
+        self.clear()
+        self._add_widget(root, None)
+
+    def _add_widget(self, widget, clip: Union[Rectangle, None]):
+        rect = widget.last_dimensions if clip is None else widget.last_dimensions.intersection(clip)
+        if rect.empty():
+            return
+        self.add(rect, widget)
+        if getattr(widget, "hover_events", False):
+            self.hover = True
+        for child in getattr(widget, "widgets", ()):
+            self._add_widget(child, rect)
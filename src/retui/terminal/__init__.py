@@ -1,3 +1,6 @@
+import contextlib
+
+from retui.base import Point, Rectangle, Span, TerminalColor
 from retui.utils import is_windows
 
 
@@ -37,6 +40,158 @@ class TerminalBuffer:
         return TerminalBuffer._cached.buffer
 
 
+class ScreenBuffer:
+    """
+    Off-screen cell grid - widgets draw into back buffer, front buffer mirrors what terminal displays.
+    Only cells that differ between them have to be written out.
+    """
+
+    # cursor move costs ~8 bytes, so it is cheaper to rewrite few unchanged cells than to jump over them
+    merge_gap = 4
+
+    def __init__(self, width: int = 0, height: int = 0):
+        self.width = 0
+        self.height = 0
+        self.default_color = TerminalColor.default()
+        self.back_chars = []
+        self.back_colors = []
+        self.front_chars = []
+        self.front_colors = []
+        # writes outside of it are dropped, it is intersection of everything on clip stack and the screen
+        self.clip_rect = Rectangle()
+        self.clip_stack = []
+        self.resize(width, height)
+
+    def resize(self, width: int, height: int):
+        """
+        Resizes both buffers, both are blank afterwards - call it after the screen was cleared
+        """
+        self.width = max(width, 0)
+        self.height = max(height, 0)
+        self.back_chars = [list(line) for line in TerminalBuffer.get_buffer(self.width, self.height, " ", False)]
+        self.back_colors = [[self.default_color] * self.width for _ in range(self.height)]
+        self.front_chars = [list(line) for line in self.back_chars]
+        self.front_colors = [list(line) for line in self.back_colors]
+        self.clip_stack.clear()
+        self.clip_rect = Rectangle(0, 0, self.width, self.height)
+
+    def push_clip(self, rect: Rectangle):
+        """
+        Restricts writes to rect, pushed clips intersect with ones below them
+        """
+        self.clip_stack.append(self.clip_rect)
+        self.clip_rect = self.clip_rect.intersection(rect)
+
+    def pop_clip(self):
+        self.clip_rect = self.clip_stack.pop()
+
+    @contextlib.contextmanager
+    def clipped(self, rect: Rectangle):
+        self.push_clip(rect)
+        try:
+            yield self
+        finally:
+            self.pop_clip()
+
+    def fill(self, rect: Rectangle, char: str = " ", color: TerminalColor = None):
+        color = self.default_color if color is None else color
+        line = char * rect.width
+        for y in range(rect.y, rect.y_end()):
+            self.put(rect.x, y, line, color)
+
+    def clear(self):
+        """
+        Blanks back buffer, front buffer is untouched so only previously drawn cells are emitted
+        """
+        for y in range(0, self.height):
+            self.back_chars[y][:] = " " * self.width
+            self.back_colors[y][:] = [self.default_color] * self.width
+
+    def invalidate(self):
+        """
+        Forgets what is on the screen, so next flush will emit every cell
+        """
+        self.front_chars = [[None] * self.width for _ in range(self.height)]
+        self.front_colors = [[None] * self.width for _ in range(self.height)]
+
+    def put(self, x: int, y: int, text: str, color: TerminalColor):
+        # clip rect never exceeds screen, writing past the edge would wrap around to next line
+        clip = self.clip_rect
+        if y < clip.y or y >= clip.y + clip.height:
+            return
+        if x < clip.x:
+            text = text[clip.x - x :]
+            x = clip.x
+        end = min(x + len(text), clip.x + clip.width)
+        if end <= x:
+            return
+        self.back_chars[y][x:end] = text[: end - x]
+        self.back_colors[y][x:end] = [color] * (end - x)
+
+    def put_spans(self, x: int, y: int, spans):
+        for text, color in spans:
+            self.put(x, y, text, color)
+            x += len(text)
+
+    def put_rows(self, x: int, y: int, rows):
+        """
+        Copies rendered rows of spans into back buffer, first row at y
+        """
+        for row in rows:
+            self.put_spans(x, y, row)
+            y += 1
+
+    def get_point(self, x: int, y: int) -> Point:
+        return Point(self.back_chars[y][x], self.back_colors[y][x])
+
+    def diff(self):
+        """
+        Yields (row, start, end) spans where back buffer differs from front buffer
+        """
+        for y in range(0, self.height):
+            back_chars = self.back_chars[y]
+            back_colors = self.back_colors[y]
+            front_chars = self.front_chars[y]
+            front_colors = self.front_colors[y]
+            if back_chars == front_chars and back_colors == front_colors:
+                continue
+
+            start = -1
+            last_changed = -1
+            for x in range(0, self.width):
+                if back_chars[x] == front_chars[x] and back_colors[x] == front_colors[x]:
+                    continue
+                if start < 0:
+                    start = x
+                elif x - last_changed > self.merge_gap:
+                    yield y, start, last_changed + 1
+                    start = x
+                last_changed = x
+            if start >= 0:
+                yield y, start, last_changed + 1
+
+    def spans(self, row: int, start: int, end: int):
+        """
+        Yields runs of same color from back buffer as spans
+        """
+        chars = self.back_chars[row]
+        colors = self.back_colors[row]
+        run_start = start
+        for x in range(start + 1, end):
+            if colors[x] != colors[run_start]:
+                yield Span("".join(chars[run_start:x]), colors[run_start])
+                run_start = x
+        if run_start < end:
+            yield Span("".join(chars[run_start:end]), colors[run_start])
+
+    def commit(self, row: int, start: int, end: int):
+        """
+        Marks span as written to the terminal
+        """
+        self.front_chars[row][start:end] = self.back_chars[row][start:end]
+        self.front_colors[row][start:end] = self.back_colors[row][start:end]
+
+
 if is_windows():
     from retui.terminal.windows import WindowsTerminal
 
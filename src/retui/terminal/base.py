@@ -1,4 +1,6 @@
 import shutil
+import sys
+import threading
 from abc import ABC, abstractmethod
 from typing import Tuple
 
@@ -6,6 +8,8 @@ from retui.base import TerminalEvent
 
 
 class SizeChangeEvent(TerminalEvent):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -14,10 +18,12 @@ class Terminal(ABC):
     def __init__(self, app, debug=True):
         # TODO: this would print without vt enabled yet update state if vt enabled in brush?
         self.app = app
+        self.event_pool = getattr(app, "event_pool", None)
         self.columns, self.rows = self.get_size()
         self.vt_supported = False
         self.debug = debug
-        pass
+        self._reading = False
+        self._reader_thread = None
 
     def update_size(self) -> Tuple[int, int]:
         # TODO CLEANUP HERE
@@ -33,6 +39,12 @@ class Terminal(ABC):
         # self.debug_print(f'{columns}x{rows}')
         return columns, rows
 
+    def output_file(self):
+        """
+        File App output goes to
+        """
+        return sys.stdout
+
     def set_color_mode(self, enable: bool) -> bool:
         # TODO: careful with overriding
         self.vt_supported = enable
@@ -46,6 +58,55 @@ class Terminal(ABC):
     def read_events(self, callback, callback_ctx) -> bool:
         pass
 
+    @staticmethod
+    def queue_events_callback(ctx, events_list):
+        loop, queue = ctx
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, events_list)
+        except RuntimeError:
+            # loop closed while read was in progress, app has ended and nobody takes the events
+            pass
+
+    def _read_events_thread(self, loop, queue):
+        while self._reading:
+            if not self.read_events(Terminal.queue_events_callback, (loop, queue)):
+                break
+
+    def start_reading(self, loop, queue):
+        """
+        Starts feeding event lists into asyncio queue.
+        Default implementation runs blocking read_events on a daemon thread,
+        backends that can integrate with event loop should override it.
+        """
+        self._reading = True
+        self._reader_thread = threading.Thread(
+            target=self._read_events_thread, args=(loop, queue), name="retui-input", daemon=True
+        )
+        self._reader_thread.start()
+
+    # how long stop_reading waits for reader thread after waking it up
+    reader_join_timeout_s = 0.5
+
+    def stop_reading(self, loop):
+        self._reading = False
+        if self._reader_thread is not None:
+            self.wake_reader()
+            # read that can't be woken up is left behind, thread is daemon so it won't keep process alive
+            self._reader_thread.join(self.reader_join_timeout_s)
+            self._reader_thread = None
+
+    def wake_reader(self):
+        """
+        Makes blocking read_events return, so reader thread can end. Backends with blocking read override it.
+        """
+        pass
+
+    def mouse_tracking(self, motion: bool):
+        """
+        Selects whether terminal reports mouse motion without buttons held, or only presses and drags
+        """
+        pass
+
     def set_title(self, title):
         if self.vt_supported:
             print(f"\033]2;{title}\007")
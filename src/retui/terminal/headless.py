@@ -0,0 +1,224 @@
+import io
+import re
+from typing import Tuple
+
+from retui.terminal.base import SizeChangeEvent, Terminal
+
+
+class VirtualScreen:
+    """
+    Interprets escape sequences written by Brush into a cell grid, like a terminal emulator would.
+    Supports cursor positioning, SGR colors, erase and autowrap - enough to check what App displays.
+    """
+
+    TOKEN_RE = re.compile(
+        r"\x1b\[([0-?]*)[ -/]*([@-~])"  # CSI
+        r"|\x1b\][^\x07]*\x07"  # OSC e.g. title
+        r"|(\n)|(\r)"
+        r"|([^\x1b\n\r]+)"  # text
+        r"|\x1b",  # lone ESC
+        re.DOTALL,
+    )
+
+    def __init__(self, columns: int, rows: int):
+        self.columns = columns
+        self.rows = rows
+        self.chars = []
+        self.colors = []
+        self.cursor_x = 0
+        self.cursor_y = 0
+        self.cursor_visible = True
+        # SGR parameters of current foreground and background, None - default
+        self.foreground = None
+        self.background = None
+        self.resize(columns, rows)
+
+    def resize(self, columns: int, rows: int):
+        self.columns = columns
+        self.rows = rows
+        self.chars = [[" "] * columns for _ in range(rows)]
+        self.colors = [[(None, None)] * columns for _ in range(rows)]
+        self.cursor_x = min(self.cursor_x, max(columns - 1, 0))
+        self.cursor_y = min(self.cursor_y, max(rows - 1, 0))
+
+    def line_feed(self):
+        self.cursor_y += 1
+        if self.cursor_y >= self.rows:
+            # scroll up
+            self.chars.pop(0)
+            self.colors.pop(0)
+            self.chars.append([" "] * self.columns)
+            self.colors.append([(None, None)] * self.columns)
+            self.cursor_y = self.rows - 1
+
+    def put_text(self, text: str):
+        color = (self.foreground, self.background)
+        for c in text:
+            if self.cursor_x >= self.columns:
+                # autowrap - writing past the edge continues in next line
+                self.cursor_x = 0
+                self.line_feed()
+            self.chars[self.cursor_y][self.cursor_x] = c
+            self.colors[self.cursor_y][self.cursor_x] = color
+            self.cursor_x += 1
+
+    def select_graphic_rendition(self, params: str):
+        values = params.split(";") if params else ["0"]
+        idx = 0
+        while idx < len(values):
+            value = values[idx]
+            if value in ("", "0"):
+                self.foreground = None
+                self.background = None
+            elif value == "39":
+                self.foreground = None
+            elif value == "49":
+                self.background = None
+            elif value in ("38", "48"):
+                # bits selector and color - same form as Brush writes them, e.g. 38;5;14
+                color = ";".join(values[idx + 1 : idx + 3])
+                if value == "38":
+                    self.foreground = color
+                else:
+                    self.background = color
+                idx += 2
+            idx += 1
+
+    def erase_line(self, mode: str):
+        start, end = 0, self.columns
+        if mode in ("", "0"):
+            start = self.cursor_x
+        elif mode == "1":
+            end = self.cursor_x + 1
+        for x in range(start, min(end, self.columns)):
+            self.chars[self.cursor_y][x] = " "
+            self.colors[self.cursor_y][x] = (None, None)
+
+    def control_sequence(self, params: str, final: str):
+        if final == "m":
+            self.select_graphic_rendition(params)
+            return
+        if params.startswith("?"):
+            if params == "?25":
+                self.cursor_visible = final == "h"
+            # other private modes - mouse tracking etc. don't change the grid
+            return
+        values = [int(value) if value else 0 for value in params.split(";")] if params else []
+        first = values[0] if values else 0
+        if final in "Hf":
+            row = values[0] if len(values) > 0 and values[0] > 0 else 1
+            column = values[1] if len(values) > 1 and values[1] > 0 else 1
+            self.cursor_y = min(row, self.rows) - 1
+            self.cursor_x = min(column, self.columns) - 1
+        elif final == "A":
+            self.cursor_y = max(self.cursor_y - max(first, 1), 0)
+        elif final == "B":
+            self.cursor_y = min(self.cursor_y + max(first, 1), self.rows - 1)
+        elif final == "C":
+            self.cursor_x = min(self.cursor_x + max(first, 1), self.columns - 1)
+        elif final == "D":
+            self.cursor_x = max(self.cursor_x - max(first, 1), 0)
+        elif final == "G":
+            self.cursor_x = min(max(first, 1), self.columns) - 1
+        elif final == "J" and first == 2:
+            self.resize(self.columns, self.rows)
+        elif final == "K":
+            self.erase_line(params)
+
+    def feed(self, data: str):
+        for match in self.TOKEN_RE.finditer(data):
+            if match.group(2) is not None:
+                self.control_sequence(match.group(1), match.group(2))
+            elif match.group(3) is not None:
+                # tty translates \n into \r\n
+                self.cursor_x = 0
+                self.line_feed()
+            elif match.group(4) is not None:
+                self.cursor_x = 0
+            elif match.group(5) is not None:
+                self.put_text(match.group(5))
+
+    def lines(self):
+        return ["".join(line) for line in self.chars]
+
+    def color_at(self, x: int, y: int) -> Tuple[str, str]:
+        return self.colors[y][x]
+
+
+class HeadlessTerminal(Terminal):
+    """
+    Terminal without TTY - size is given, input is scripted with feed and output is captured.
+    Captured output can be interpreted into a cell grid with VirtualScreen, for snapshot tests and benchmarks.
+    """
+
+    def __init__(self, app=None, columns: int = 80, rows: int = 24):
+        # rows of the emulated terminal, App uses one less - same as real terminals
+        self.size = (columns, rows)
+        self.output = io.StringIO()
+        self.virtual_screen = VirtualScreen(columns, rows)
+        self.scripted = []
+        self.loop = None
+        self.queue = None
+        super().__init__(app)
+        self.vt_supported = True
+
+    def get_size(self) -> Tuple[int, int]:
+        columns, rows = self.size
+        return columns, rows - 1
+
+    def output_file(self):
+        return self.output
+
+    def resize(self, columns: int, rows: int):
+        """
+        Emulates window resize - App gets SizeChangeEvent like after SIGWINCH
+        """
+        self.size = (columns, rows)
+        self.virtual_screen.resize(columns, rows)
+        self.feed([SizeChangeEvent()])
+
+    def feed(self, events_list):
+        """
+        Scripts input - events_list is delivered as single batch, same as one read of real terminal
+        """
+        if self.queue is not None:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, events_list)
+        else:
+            self.scripted.append(events_list)
+
+    def interactive_mode(self):
+        pass
+
+    def set_title(self, title):
+        if self.vt_supported:
+            self.output.write(f"\033]2;{title}\007")
+
+    def read_events(self, callback, callback_ctx) -> bool:
+        if self.scripted:
+            callback(callback_ctx, self.scripted.pop(0))
+        return True
+
+    def start_reading(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+        for events_list in self.scripted:
+            queue.put_nowait(events_list)
+        self.scripted.clear()
+
+    def stop_reading(self, loop):
+        self.loop = None
+        self.queue = None
+
+    def take_output(self) -> str:
+        """
+        Returns output written since last call, and applies it to virtual screen
+        """
+        data = self.output.getvalue()
+        self.output.seek(0)
+        self.output.truncate()
+        self.virtual_screen.feed(data)
+        return data
+
+    def lines(self):
+        self.take_output()
+        return self.virtual_screen.lines()
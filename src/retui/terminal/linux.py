@@ -38,7 +38,7 @@ class LinuxTerminal(Terminal):
         _log.debug(f"stdin cc VMIN: 0x{self.prev_tc[6][termios.VMIN]} -> 0x{new_tc[6][termios.VMIN]}")
         _log.debug(f"stdin cc VTIME: 0x{self.prev_tc[6][termios.VTIME]} -> 0x{new_tc[6][termios.VTIME]}")
 
-        self.input_interpreter = retui.input_handling.InputInterpreter(sys.stdin)
+        self.input_interpreter = retui.input_handling.InputInterpreter(sys.stdin, self.event_pool)
 
     def __del__(self):
         # restore stdin
@@ -49,7 +49,7 @@ class LinuxTerminal(Terminal):
         fcntl.fcntl(sys.stdin, fcntl.F_SETFL, self.prev_fl)
         print("xRestore console done")
         if self.is_interactive_mode:
-            print("\x1B[?1006l\x1B[?1015l\x1B[?1003l")
+            print("\x1B[?1006l\x1B[?1015l\x1B[?1003l\x1B[?1002l")
         # where show cursor?
 
     window_change_event_ctx = None
@@ -62,19 +62,41 @@ class LinuxTerminal(Terminal):
         # inject special input on stdin?
         self.window_changed = True
 
+    def start_reading(self, loop, queue):
+        # stdin is non-blocking, so it can be read straight from event loop
+        loop.add_reader(sys.stdin.fileno(), self.stdin_ready, queue)
+        loop.add_signal_handler(signal.SIGWINCH, self.window_change_queue, queue)
+
+    def stop_reading(self, loop):
+        loop.remove_reader(sys.stdin.fileno())
+        loop.remove_signal_handler(signal.SIGWINCH)
+
+    def stdin_ready(self, queue):
+        ret = self.input_interpreter.read_ready()
+        if ret:
+            queue.put_nowait([ret])
+
+    def window_change_queue(self, queue):
+        queue.put_nowait([SizeChangeEvent()])
+
     def interactive_mode(self):
         self.is_interactive_mode = True
         LinuxTerminal.window_change_event_ctx = self
         signal.signal(signal.SIGWINCH, LinuxTerminal.window_change_handler)
         # ctrl-z not allowed
         signal.signal(signal.SIGTSTP, signal.SIG_IGN)
-        # enable mouse - xterm, sgr1006
-        print("\x1B[?1003h\x1B[?1006h")
+        # enable mouse - button events only, any-motion is enabled when some widget wants hover, sgr1006
+        print("\x1B[?1002h\x1B[?1006h")
         # focus event
         # CSI I on focus
         # CSI O on loss
         print("\x1B[?1004h")
 
+    def mouse_tracking(self, motion: bool):
+        # any-motion tracking reports every cell mouse crosses, xterm button-event tracking only drags
+        sys.stdout.write("\x1B[?1003h" if motion else "\x1B[?1003l\x1B[?1002h")
+        sys.stdout.flush()
+
     def read_events(self, callback, callback_ctx) -> bool:
         events_list = []
 
@@ -2,7 +2,6 @@ import ctypes
 import ctypes.wintypes
 import msvcrt
 import sys
-from typing import Union
 
 import retui.input_handling.windows
 from retui.input_handling.windows import INPUT_RECORD
@@ -54,11 +53,31 @@ class WindowsTerminal(Terminal):
             ("GetNumberOfConsoleInputEvents", self.kernel32),
             get_number_of_console_input_events_params,
         )
+        write_console_input_proto = ctypes.WINFUNCTYPE(
+            ctypes.wintypes.BOOL,
+            ctypes.wintypes.HANDLE,
+            ctypes.wintypes.LPVOID,  # PINPUT_RECORD
+            ctypes.wintypes.DWORD,
+            ctypes.wintypes.LPDWORD,
+        )
+        write_console_input_params = (
+            (1, "hConsoleInput", 0),
+            (1, "lpBuffer", 0),
+            (1, "nLength", 0),
+            (1, "lpNumberOfEventsWritten", 0),
+        )
+        self.writeConsoleInput = write_console_input_proto(
+            ("WriteConsoleInputW", self.kernel32), write_console_input_params
+        )
         self.blocking = True
+        # records are read in batches into preallocated array, instead of round trip per record
+        self.read_batch_size = 128
+        self.input_records = (INPUT_RECORD * self.read_batch_size)()
 
     KEY_EVENT = 0x1
     MOUSE_EVENT = 0x2
     WINDOW_BUFFER_SIZE_EVENT = 0x4
+    FOCUS_EVENT = 0x10
 
     def interactive_mode(self):
         self.window_change_size_events(True)
@@ -68,52 +87,65 @@ class WindowsTerminal(Terminal):
         self.blocking = blocking
 
     def demo_mode(self):
-        self.blocking_input(False)
-
-    def read_console_input(self) -> Union[INPUT_RECORD, None]:
-        record = retui.input_handling.windows.INPUT_RECORD()
+        # input is read on separate thread, blocking read won't keep app from ending
+        pass
+
+    def wake_reader(self):
+        # blocked ReadConsoleInput returns on any record, focus event is ignored by read_events
+        record = INPUT_RECORD()
+        record.EventType = self.FOCUS_EVENT
+        written = ctypes.wintypes.DWORD(0)
+        self.writeConsoleInput(self.consoleHandleIn, ctypes.byref(record), 1, ctypes.byref(written))
+
+    def read_console_input(self) -> int:
+        """
+        Reads available records into self.input_records, returns number of records read
+        """
         number_of_events = ctypes.wintypes.DWORD(0)
-        if self.blocking is False:
-            ret_val = self.getNumberOfConsoleInputEvents(self.consoleHandleIn, ctypes.byref(number_of_events))
-            if number_of_events.value == 0:
-                return None
+        ret_val = self.getNumberOfConsoleInputEvents(self.consoleHandleIn, ctypes.byref(number_of_events))
+        count = number_of_events.value if ret_val != 0 else 0
+        if count == 0:
+            if self.blocking is False:
+                return 0
+            # blocks until at least one record is there
+            count = 1
+        count = min(count, self.read_batch_size)
 
-        # TODO: N events
         ret_val = self.readConsoleInput(
             self.consoleHandleIn,
-            ctypes.byref(record),
-            1,
+            self.input_records,
+            count,
             ctypes.byref(number_of_events),
         )
         if ret_val == 0:
-            return None
-        return record
+            return 0
+        return number_of_events.value
 
     def read_events(self, callback, callback_ctx) -> bool:
         events_list = []
-        record = self.read_console_input()
-        if record is None:
-            pass
-        elif record.EventType == self.WINDOW_BUFFER_SIZE_EVENT:
-            events_list.append(SizeChangeEvent())
-        elif record.EventType == self.MOUSE_EVENT:
-            event = retui.input_handling.MouseEvent.from_windows_event(record.Event.MouseEvent)
-            if event:
-                events_list.append(event)
-        elif record.EventType == self.KEY_EVENT:
-            events_list.append(
-                retui.input_handling.KeyEvent(
-                    key_down=bool(record.Event.KeyEvent.bKeyDown),
-                    repeat_count=record.Event.KeyEvent.wRepeatCount,
-                    vk_code=record.Event.KeyEvent.wVirtualKeyCode,
-                    vs_code=record.Event.KeyEvent.wVirtualScanCode,
-                    char=record.Event.KeyEvent.uChar.AsciiChar,
-                    wchar=record.Event.KeyEvent.uChar.UnicodeChar,
-                    control_key_state=record.Event.KeyEvent.dwControlKeyState,
+        records = self.input_records
+        for idx in range(self.read_console_input()):
+            record = records[idx]
+            if record.EventType == self.WINDOW_BUFFER_SIZE_EVENT:
+                events_list.append(SizeChangeEvent())
+            elif record.EventType == self.MOUSE_EVENT:
+                retui.input_handling.MouseEvent.from_windows_event(
+                    record.Event.MouseEvent, events_list, self.event_pool
+                )
+            elif record.EventType == self.KEY_EVENT:
+                key_event = record.Event.KeyEvent
+                new_event = retui.input_handling.KeyEvent if self.event_pool is None else self.event_pool.key_event
+                events_list.append(
+                    new_event(
+                        key_down=bool(key_event.bKeyDown),
+                        repeat_count=key_event.wRepeatCount,
+                        vk_code=key_event.wVirtualKeyCode,
+                        vs_code=key_event.wVirtualScanCode,
+                        char=key_event.uChar.AsciiChar,
+                        wchar=key_event.uChar.UnicodeChar,
+                        control_key_state=key_event.dwControlKeyState,
+                    )
                 )
-            )
-        else:
-            pass
 
         if len(events_list):
             callback(callback_ctx, events_list)
@@ -1,7 +1,10 @@
 import logging
+import marshal
+import os
+import re
 from abc import ABC
 from dataclasses import dataclass, field
-from enum import Enum, IntEnum, auto
+from enum import Enum, auto
 from os import PathLike
 from typing import Union
 
@@ -19,6 +22,34 @@ class Selector:
     element_classes: list[str]
 
 
+class WidgetStyle:
+    """
+    Style of single widget - selector key is built again only after id or classes change,
+    attributes are looked up again only after sheet changes
+    """
+
+    __slots__ = ("classes", "element_id", "key", "selectors", "version", "attributes")
+
+    def __init__(self, classes: tuple):
+        self.classes = classes
+        self.element_id = None
+        self.key = None
+        self.selectors = None
+        self.version = -1
+        self.attributes = None
+
+    def get(self, element_name: str, identifier: str, selectors: "Selectors") -> "Attributes":
+        if self.key is None or self.element_id != identifier:
+            self.element_id = identifier
+            self.key = (element_name, f"#{identifier}", tuple(f".{name}" for name in self.classes))
+            self.attributes = None
+        if self.attributes is None or self.selectors is not selectors or self.version != selectors.version:
+            self.attributes = selectors.effective_attributes(self.key)
+            self.selectors = selectors
+            self.version = selectors.version
+        return self.attributes
+
+
 def css_color_to_color(string: str):
     # case of #aabbcc !important
     text = string.split(" ")[0]
@@ -39,13 +70,27 @@ def css_color_to_color(string: str):
     return None
 
 
-@dataclass
+@dataclass(frozen=True)
 class Attributes:
+    """
+    Immutable - resolved attributes are shared between widgets and cached by Selectors, don't modify color in place
+    """
+
     color: TerminalColor = field(default_factory=TerminalColor.default)
 
-    def __iadd__(self, other):
-        self.color += other.color
-        return self
+    def __add__(self, other):
+        # other wins where it sets a color, += rebinds to new instance
+        if other is None:
+            return self
+        foreground = self.color.foreground if other.color.foreground.none() else other.color.foreground
+        background = self.color.background if other.color.background.none() else other.color.background
+        return Attributes(color=TerminalColor(foreground=foreground, background=background))
+
+    def apply(self, color: TerminalColor) -> TerminalColor:
+        # color with attributes on top of it, the same instance when they don't set anything
+        if self.color.foreground.none() and self.color.background.none():
+            return color
+        return (Attributes(color=color) + self).color
 
     @staticmethod
     def handle_background_color(this, prop, value):
@@ -101,9 +146,12 @@ class Selectors(ABC):
         self.id_selectors = {}
         self.class_selectors = {}
         self.universal_selector = None
+        # bumped on every change of the sheet, resolved attributes are cached per version
+        self.version = 0
+        self._resolved = {}
 
     def add_property(self, selectors: Union[str, list[str]], prop: str, value: str):
-        if selectors is str:
+        if isinstance(selectors, str):
             # single selector
             selectors = [selectors]
 
@@ -112,7 +160,7 @@ class Selectors(ABC):
                 # "div p" unsupported
                 continue
             # div p, div -> ["div p", "div"] so if we were to handle them properly it is still some parsing to do
-            print(f"adding: {selector} {{ {prop}: {value}; }}")
+            _log.debug(f"adding: {selector} {{ {prop}: {value}; }}")
             selector_type = self.Type.from_name(selector)
             if selector_type == self.Type.UNSUPPORTED:
                 continue
@@ -123,8 +171,10 @@ class Selectors(ABC):
 
     def add_selector(self, selector_type: Type, name: str, attributes):
         if attributes is None:
-            print(f"invalid selector - {selector_type} {name} - attributes: {attributes}")
+            _log.error(f"invalid selector - {selector_type} {name} - attributes: {attributes}")
             return
+        self.version += 1
+        self._resolved.clear()
         try:
             if selector_type == self.Type.UNIVERSAL:
                 if self.universal_selector is None:
@@ -155,19 +205,61 @@ class Selectors(ABC):
             else:
                 pass
         except Exception as e:
-            print(f"Exception {selector_type}, {name}, {attributes}")
+            _log.error(f"Exception {selector_type}, {name}, {attributes}")
             raise e
 
-    def effective_selector(self, selector: Selector):
-        none_attributes = Attributes()
-        attributes = Attributes()
-        attributes += self.universal_selector
-        attributes += self.selectors.get(selector.element_name, none_attributes)
+    def effective_selector(self, selector: Selector) -> Attributes:
+        """
+        Attributes for selector, resolved once per version of the sheet - returned instance is shared
+        """
+        return self.effective_attributes((selector.element_name, selector.element_id, tuple(selector.element_classes)))
+
+    def effective_attributes(self, key: tuple) -> Attributes:
+        """
+        Same as effective_selector, for key of (element_name, element_id, element_classes tuple)
+        """
+        # cache is cleared with every version bump
+        attributes = self._resolved.get(key)
+        if attributes is None:
+            element_name, element_id, element_classes = key
+            attributes = self.resolve(Selector(element_name, element_id, list(element_classes)))
+            self._resolved[key] = attributes
+        return attributes
+
+    def resolve(self, selector: Selector) -> Attributes:
+        # specificity order - universal, element, classes, id
+        attributes = Attributes() + self.universal_selector
+        attributes += self.selectors.get(selector.element_name)
         for name in selector.element_classes:
-            attributes += self.class_selectors.get(name, none_attributes)
-        attributes += self.id_selectors.get(selector.element_id, none_attributes)
+            attributes += self.class_selectors.get(name)
+        attributes += self.id_selectors.get(selector.element_id)
         return attributes
 
+    def update_from(self, other: "Selectors") -> set:
+        """
+        Replaces rules with rules of other sheet, returns names of selectors which attributes changed
+        """
+        changed = set()
+        for own, new in (
+            (self.selectors, other.selectors),
+            (self.id_selectors, other.id_selectors),
+            (self.class_selectors, other.class_selectors),
+        ):
+            for name in own.keys() | new.keys():
+                if own.get(name) != new.get(name):
+                    changed.add(name)
+        if self.universal_selector != other.universal_selector:
+            changed.add("*")
+
+        if changed:
+            self.selectors = dict(other.selectors)
+            self.id_selectors = dict(other.id_selectors)
+            self.class_selectors = dict(other.class_selectors)
+            self.universal_selector = other.universal_selector
+            self.version += 1
+            self._resolved.clear()
+        return changed
+
     def __str__(self):
         return "selectors: \n\t{}\nid_selectors: \n\t{}\nclass_selectors: \n\t{}\nuniversal_selector: \n\t{}\n".format(
             "\n\t".join(self.selectors),
@@ -177,174 +269,106 @@ class Selectors(ABC):
         )
 
 
-class CssParserState(IntEnum):
-    SELECTOR = 0
-    OPEN_SECTION = 1
-    PROPERTY = 2
-    VALUE = 3
-    COLON = 4
-    SEMI_COLON = 5
-    COMMENT = 6
-
-
 class CssParser:
-    # TODO: properly handle nested { {
+    """
+    Supports subset of css - rules with comma separated selectors and declarations, at-rules like @media are skipped.
+    Parsed rules are cached next to the stylesheet, so unchanged file is not parsed again.
+    """
+
     # https://www.w3.org/TR/css-syntax-3/#parsing-overview
+    # unterminated comment runs to the end of file
+    COMMENT_RE = re.compile(r"/\*.*?(?:\*/|$)", re.DOTALL)
+    # text up to next brace and the brace
+    BLOCK_RE = re.compile(r"([^{}]*)([{}])")
+    DECLARATION_RE = re.compile(r"([^:;]+):([^;]*)")
+    CACHE_SUFFIX = ".cache"
+    # bump when format of rules changes
+    CACHE_FORMAT = 1
 
-    @staticmethod
-    def parse(file_name: PathLike[str], selectors: Union[Selectors, None]) -> Selectors:
+    @classmethod
+    def parse(
+        cls,
+        file_name: PathLike[str],
+        selectors: Union[Selectors, None],
+        cache: bool = True,
+        encoding: str = "UTF-8",
+    ) -> Selectors:
         if selectors is None:
             selectors = Selectors()
-        with open(file_name, "r") as f:
-            last_state = CssParserState.SELECTOR
-            state = CssParserState.SELECTOR
-            selector = None
-            prop = None
-            failed = None
-            line_num = 0
-            word = ""
-            non_printables = ["\n", "\r", "\t"]
-            for line in f:
-                line_num += 1
-                idx = 0
-                end = len(line)
-                while idx < end:
-                    c = line[idx]
-                    # big switch goes here
-                    if state == CssParserState.COMMENT:
-                        if c == "*":
-                            # hope
-                            if idx + 1 < end:
-                                c_next = line[idx + 1]
-                                if c_next == "/":
-                                    # comment end
-                                    # restore state and skip */
-                                    state = last_state
-                                    idx += 2
-                                    continue
-                        idx += 1
-                        continue
-
-                    if c == "/":
-                        # comment?
-                        if idx + 1 < end:
-                            # comment can't span to next line
-                            c_next = line[idx + 1]
-                            if c_next == "*":
-                                # comment start
-                                # store state and skip /*
-                                last_state = state
-                                state = CssParserState.COMMENT
-                                idx += 2
-                                continue
-
-                    if c in non_printables:
-                        c = " "
-
-                    if state == CssParserState.SELECTOR:
-                        if len(word) > 0:
-                            if c == "{":
-                                # '*{'
-                                #   ^
-                                state = CssParserState.OPEN_SECTION
-                                # omit increment - we will hit the switch for {
-                                continue
-                            # elif c != ' ':
-                            #    word += c
-                            else:
-                                # we will have all words, need to split them later
-                                word += c
-                                # state = State.open_sect
-                        elif c == " ":
-                            # optimization
-                            # '    * {'
-                            #  ^^^^
-                            pass
-                        else:
-                            # '    * {'
-                            #      ^
-                            word += c
-                        idx += 1
-                        continue
-                    elif state == CssParserState.OPEN_SECTION:
-                        # if c == ' ':
-                        #
-                        #    # skipping spaces
-                        #    pass
-                        if c == "{":
-                            selector = word
-                            word = ""
-                            state = CssParserState.PROPERTY
-                            pass
-                        else:
-                            failed = Exception(f'{line_num}: state: {state} - got "{c}" - line: "{line}"')
-                            break
-                        idx += 1
-                        continue
-                    elif state == CssParserState.PROPERTY:
-                        if c == ":":
-                            state = CssParserState.COLON
-                            continue
-                        elif c == "}":
-                            # reset word
-                            word = ""
-                            state = CssParserState.SELECTOR
-                        # elif c == ' ':
-                        #     # yes, i know that this will remove spaces
-                        #     pass
-                        else:
-                            word += c
-                        idx += 1
-                        continue
-                    elif state == CssParserState.COLON:
-                        if c == ":":
-                            prop = word
-                            word = ""
-                            state = CssParserState.VALUE
-                        # elif c == ' ':
-                        #    pass
-                        else:
-                            failed = Exception(f'{line_num}: state: {state} - got "{c}" - line: "{line}"')
-                            break
-                        idx += 1
-                        continue
-                    elif state == CssParserState.VALUE:
-                        # if c == ' ':
-                        #    pass
-                        if c == ";":
-                            state = CssParserState.SEMI_COLON
-                            continue
-                        else:
-                            word += c
-                        idx += 1
-                        continue
-                    elif state == CssParserState.SEMI_COLON:
-                        if c == ";":
-                            value = word
-                            word = ""
-                            state = CssParserState.PROPERTY
-                            prop = " ".join(prop.split())
-                            value = " ".join(value.split())
-                            selector_split = StringHelper.split_trim(selector, ",")
-                            selectors.add_property(selector_split, prop, value)
-                        # elif c == ' ':
-                        #    pass
-                        else:
-                            failed = Exception(f'{line_num}: state: {state} - got "{c}" - line: "{line}"')
-                            break
-                        idx += 1
-                        continue
-                    else:
-                        failed = Exception(f"UNHANDLED STATE: {state}")
-                        break
-                if failed:
-                    break
+        for selector_list, declarations in cls.load_rules(file_name, cache, encoding):
+            for prop, value in declarations:
+                selectors.add_property(list(selector_list), prop, value)
+        return selectors
+
+    @classmethod
+    def parse_rules(cls, text: str) -> list:
+        """
+        Returns rules as list of (selectors, declarations), declarations are (property, value) pairs
+        """
+        text = cls.COMMENT_RE.sub(" ", text)
+        rules = []
+        depth = 0
+        prelude = ""
+        nested = False
+        for match in cls.BLOCK_RE.finditer(text):
+            content, brace = match.groups()
+            if brace == "{":
+                depth += 1
+                if depth == 1:
+                    # statement at-rules like @charset "UTF-8"; end with semicolon
+                    prelude = content.rsplit(";", 1)[-1].strip()
+                    nested = False
+                else:
+                    # nested blocks - @media, @keyframes - are not supported, whole rule is skipped
+                    nested = True
+                continue
 
-            if failed:
-                # cleanup goes here
-                raise failed
+            if depth == 0:
+                line_num = text.count("\n", 0, match.end() - 1) + 1
+                raise Exception(f'{line_num}: unexpected "}}"')
+            if depth == 1 and not nested and not prelude.startswith("@"):
+                selector_list = tuple(" ".join(selector.split()) for selector in StringHelper.split_trim(prelude, ","))
+                declarations = tuple(
+                    (" ".join(prop.split()), " ".join(value.split()))
+                    for prop, value in cls.DECLARATION_RE.findall(content)
+                    if not prop.isspace()
+                )
+                if selector_list and declarations:
+                    rules.append((selector_list, declarations))
+            depth -= 1
+
+        if depth != 0:
+            raise Exception(f'unexpected end of file - missing "}}" for "{prelude}"')
+        return rules
 
-        return selectors
+    @classmethod
+    def load_rules(cls, file_name: PathLike[str], cache: bool = True, encoding: str = "UTF-8") -> list:
+        stat = os.stat(file_name)
+        key = (cls.CACHE_FORMAT, marshal.version, stat.st_mtime_ns, stat.st_size)
+        cache_name = os.fspath(file_name) + cls.CACHE_SUFFIX
+        if cache:
+            try:
+                with open(cache_name, "rb") as f:
+                    cached_key, rules = marshal.loads(f.read())  # nosec B302 - written below by parser
+                if cached_key == key:
+                    return rules
+            except (OSError, EOFError, ValueError, TypeError):
+                # missing or from other python version
+                pass
+
+        with open(file_name, "r", encoding=encoding) as f:
+            rules = cls.parse_rules(f.read())
+
+        if cache:
+            # written aside and moved, so concurrently starting app never reads half of it
+            temp_name = f"{cache_name}.{os.getpid()}"
+            try:
+                with open(temp_name, "wb") as f:
+                    f.write(marshal.dumps((key, rules)))
+                os.replace(temp_name, cache_name)
+            except OSError as e:
+                _log.debug(f"stylesheet cache not stored - {cache_name}: {e}")
+        return rules
 
 
 class Theme:
@@ -386,13 +410,32 @@ class Theme:
             self.border = 9 * [Point(" ")]
 
         self.selectors = Selectors()
+        # files loaded into selectors, in order
+        self.stylesheets = []
+        # bumped on every change, widgets drawn with this theme re-render when it moves
+        self.version = 0
+
+    def load_stylesheet(self, file_name: PathLike[str]):
+        CssParser.parse(file_name, self.selectors)
+        self.stylesheets.append(file_name)
+
+    def reload_stylesheets(self) -> set:
+        """
+        Parses stylesheets again, returns names of selectors that changed - rules added by hand are dropped
+        """
+        selectors = Selectors()
+        for file_name in self.stylesheets:
+            CssParser.parse(file_name, selectors)
+        return self.selectors.update_from(selectors)
 
     def set_color(self, color):
         for i in range(0, 9):
             self.border[i].color = color
+        self.version += 1
 
     def border_inside_set_color(self, color):
         self.border[0].color = color
+        self.version += 1
 
     @staticmethod
     def border_from_str(border_str: str) -> list[Point]:
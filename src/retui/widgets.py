@@ -1,10 +1,11 @@
 import dataclasses
 import logging
 from abc import ABC
-from typing import Tuple, Union
+from collections import OrderedDict, deque
+from typing import List, Tuple, Union
 
 import retui.theme
-from retui.base import Rectangle, TerminalColor
+from retui.base import Rectangle, Span, TerminalColor, append_span
 from retui.default_themes import ThemePoint
 from retui.defaults import default_value
 from retui.enums import DimensionsFlag, Dock, TextAlign, WordWrap
@@ -25,6 +26,8 @@ class Text:
         text_align: TextAlign = default_value("text_align"),
         text_wrap: WordWrap = default_value("text_wrap"),
     ):
+        # bumped whenever visible content may change, widgets key their render cache on it
+        self.version = 0
         self.text = text
         self.text_align = text_align
         self.text_wrap = text_wrap
@@ -32,11 +35,40 @@ class Text:
         self.text_align_fun = Text.get_text_align_function(text_align)
         self.width = -1
         self.height = -1
+        # materialized rows - visible window plus margin, window_offset points to first visible row
         self.lines = []
+        self.window_offset = 0
+        # window reaches end of the text
+        self.window_complete = True
         self.empty_line = ""
         self.lines_count = 0
         self.shift = 0
 
+    # extra rows materialized below visible window, so small scroll doesn't need wrapping
+    scroll_margin = 8
+    # wrapped windows kept for recently used widths, so resizing back and forth doesn't wrap again
+    layout_cache_size = 4
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, new_text):
+        self._text = new_text
+        self.version += 1
+        self._source_lines = None
+        self._layout_cache = OrderedDict()
+        # viewport anchor - first visible row is row top_row of wrapped source line top_line
+        self.top_line = 0
+        self.top_row = 0
+        self.width = -1
+
+    def source_lines(self):
+        if self._source_lines is None:
+            self._source_lines = self._text.splitlines(keepends=False)
+        return self._source_lines
+
     @staticmethod
     def word_wrap_trim(width: int, line: str):
         return line[:width], None
@@ -91,42 +123,151 @@ class Text:
         if self.dimensions_match(width, height):
             return
 
-        lines = self.text.splitlines(keepends=False)
-        self.lines.clear()
+        if width != self.width:
+            # keep the same source line on top
+            self.top_row = 0
+        self.width = width
+        self.height = height
+        self.materialize()
+
+    def materialize(self):
+        """
+        Wraps only rows from viewport anchor to the end of visible window plus margin
+        """
+        width = self.width
+        height = self.height
         self.empty_line = " " * width
-        leftover = None
-        while lines or leftover:
-            if leftover:
-                line = leftover
-                leftover = None
-            else:
-                line = lines.pop(0)
-            if len(line) < width:
-                nice_line = self.text_align_fun(width, line)
-                pass
-            else:
-                nice_line, leftover = self.word_wrap_fun(width, line)
-            if leftover and len(leftover) == 0:
-                leftover = None
+        self.window_offset = 0
+
+        key = (hash(self._text), width, self.top_line, self.top_row, self.text_align, self.text_wrap)
+        cached = self._layout_cache.get(key)
+        if cached is not None and (cached[1] or len(cached[0]) >= height):
+            self._layout_cache.move_to_end(key)
+            self.lines, self.window_complete = cached
+            self.update_visible()
+            return
 
-            self.lines.append(nice_line)
+        source = self.source_lines()
+        self.lines = []
+        line_idx = self.top_line
+        row_idx = self.top_row
+        while line_idx < len(source) and len(self.lines) < height + self.scroll_margin:
+            self.lines.extend(self.wrap_line(width, source[line_idx])[row_idx:])
+            row_idx = 0
+            line_idx += 1
+        self.window_complete = line_idx >= len(source)
+        self._layout_cache[key] = (self.lines, self.window_complete)
+        if len(self._layout_cache) > self.layout_cache_size:
+            self._layout_cache.popitem(last=False)
+        self.update_visible()
+
+    def update_visible(self):
+        self.lines_count = min(len(self.lines) - self.window_offset, self.height)
+        # alignment applies only when whole text fits
+        at_top = self.top_line == 0 and self.top_row == 0
+        self.shift = self.align_shift(self.height) if at_top and self.window_complete else 0
+
+    def line_rows(self, line_idx: int) -> int:
+        return max(len(self.wrap_line(self.width, self.source_lines()[line_idx])), 1)
+
+    def scroll(self, rows: int) -> bool:
+        """
+        Moves viewport by rows, negative - up. Cost depends on rows moved and height, not on text size.
+        Returns True if viewport moved.
+        """
+        if self.width <= 0 or self.height <= 0 or rows == 0:
+            return False
+        source = self.source_lines()
+        line_idx = self.top_line
+        row_idx = self.top_row
+        moved = 0
+        if rows > 0:
+            # don't go past last full page
+            remaining = min(rows, self.rows_below(line_idx, row_idx, rows + self.height) - self.height)
+            while remaining > 0:
+                step = min(self.line_rows(line_idx) - 1 - row_idx, remaining)
+                if step > 0:
+                    row_idx += step
+                else:
+                    line_idx += 1
+                    row_idx = 0
+                    step = 1
+                remaining -= step
+                moved += step
+        else:
+            remaining = -rows
+            while remaining > 0:
+                if row_idx > 0:
+                    step = min(row_idx, remaining)
+                    row_idx -= step
+                elif line_idx > 0:
+                    line_idx -= 1
+                    row_idx = self.line_rows(line_idx) - 1
+                    step = 1
+                else:
+                    break
+                remaining -= step
+                moved -= step
+
+        if moved == 0 or line_idx >= len(source):
+            return False
 
-        # Top, bottom, middle
-        self.lines_count = len(self.lines)
-        self.shift = 0
+        self.top_line = line_idx
+        self.top_row = row_idx
+        self.version += 1
+        window_offset = self.window_offset + moved
+        if 0 <= window_offset and (self.window_complete or window_offset + self.height <= len(self.lines)):
+            # still inside materialized window
+            self.window_offset = window_offset
+            self.update_visible()
+        else:
+            self.materialize()
+        return True
 
+    def scroll_page(self, pages: int) -> bool:
+        return self.scroll(pages * max(self.height - 1, 1))
+
+    def rows_below(self, line_idx: int, row_idx: int, limit: int) -> int:
+        """
+        Counts rows from given position to the end of text, stops counting at limit
+        """
+        source = self.source_lines()
+        count = -row_idx
+        while line_idx < len(source) and count < limit:
+            count += self.line_rows(line_idx)
+            line_idx += 1
+        return min(count, limit)
+
+    def align_shift(self, height: int) -> int:
+        # Top, bottom, middle
+        shift = 0
         if self.lines_count < height:
             if self.text_align.is_top():
                 pass
             elif self.text_align.is_middle():
                 # e.g 3 lines, 8 height = 3, zero indexing - so we need 2
-                self.shift = (height // 2) - ((self.lines_count - 1) // 2) - (height % 2)
+                shift = (height // 2) - ((self.lines_count - 1) // 2) - (height % 2)
             elif self.text_align.is_bottom():
                 # e.g. 3 lines, 8 height = 5
-                self.shift = height - self.lines_count
+                shift = height - self.lines_count
+        return shift
 
-        self.width = width
-        self.height = height
+    def wrap_line(self, width: int, line: str) -> list:
+        """
+        Splits single line (without line breaks) into aligned rows of given width
+        """
+        rows = []
+        if width <= 0:
+            return rows
+        while True:
+            if len(line) < width:
+                rows.append(self.text_align_fun(width, line))
+                break
+            head, line = self.word_wrap_fun(width, line)
+            rows.append(head)
+            if not line:
+                break
+        return rows
 
     def dimensions_match(self, width: int, height: int):
         return self.width == width and self.height == height
@@ -135,10 +276,104 @@ class Text:
         return (
             self.empty_line
             if idx < self.shift or idx >= (self.lines_count + self.shift)
-            else self.lines[idx - self.shift]
+            else self.lines[self.window_offset + idx - self.shift]
         )
 
 
+class StreamText(Text):
+    """
+    Text backed by ring buffer of lines - appending is O(1) and only new lines are wrapped.
+    When there are more rows than fits, the newest ones are shown.
+    """
+
+    def __init__(
+        self,
+        max_lines: int,
+        text: str = "",
+        text_align: TextAlign = default_value("text_align"),
+        text_wrap: WordWrap = default_value("text_wrap"),
+    ):
+        self.version = 0
+        self.raw_lines = deque(maxlen=max_lines)
+        # wrapped rows for each raw line, None - not wrapped yet
+        self.wrapped_lines = deque(maxlen=max_lines)
+        # last line was not terminated with new line, next append continues it
+        self.partial = False
+        self.changed = True
+        super().__init__(text=text, text_align=text_align, text_wrap=text_wrap)
+
+    @property
+    def text(self):
+        return "\n".join(self.raw_lines)
+
+    @text.setter
+    def text(self, new_text):
+        self.clear()
+        self.append(new_text)
+
+    def clear(self):
+        self.raw_lines.clear()
+        self.wrapped_lines.clear()
+        self.partial = False
+        self.changed = True
+        self.version += 1
+
+    def append(self, text: str):
+        if not text:
+            return
+        pieces = text.split("\n")
+        terminated = pieces[-1] == ""
+        if terminated:
+            pieces.pop()
+        if pieces and self.partial and self.raw_lines:
+            self.raw_lines[-1] += pieces[0].rstrip("\r")
+            self.wrapped_lines[-1] = None
+            pieces = pieces[1:]
+        for piece in pieces:
+            self.raw_lines.append(piece.rstrip("\r"))
+            self.wrapped_lines.append(None)
+        self.partial = not terminated
+        self.changed = True
+        self.version += 1
+
+    def prepare_lines(self, width: int, height: int):
+        if not self.changed and self.dimensions_match(width, height):
+            return
+
+        if self.width != width:
+            # whole buffer has to be wrapped again, it is bounded by max_lines
+            for idx in range(0, len(self.wrapped_lines)):
+                self.wrapped_lines[idx] = None
+
+        # walk from the newest line, wrap only what wasn't wrapped yet and stop once screen is filled
+        rows = []
+        idx = len(self.raw_lines) - 1
+        while idx >= 0 and len(rows) < height:
+            wrapped = self.wrapped_lines[idx]
+            if wrapped is None:
+                wrapped = self.wrap_line(width, self.raw_lines[idx])
+                self.wrapped_lines[idx] = wrapped
+            rows.append(wrapped)
+            idx -= 1
+
+        self.lines.clear()
+        for wrapped in reversed(rows):
+            self.lines.extend(wrapped)
+        if len(self.lines) > height:
+            del self.lines[: len(self.lines) - height]
+
+        self.empty_line = " " * width
+        self.lines_count = len(self.lines)
+        self.shift = self.align_shift(height)
+        self.width = width
+        self.height = height
+        self.changed = False
+
+    def scroll(self, rows: int) -> bool:
+        # always follows the newest lines
+        return False
+
+
 @official_widget
 class TerminalWidget(ABC):
     @classmethod
@@ -159,6 +394,8 @@ class TerminalWidget(ABC):
         tab_stop: bool = default_value("tab_stop"),
         scroll_horizontal: bool = default_value("scroll_horizontal"),
         scroll_vertical: bool = default_value("scroll_vertical"),
+        hover_events: bool = False,
+        classes: Union[List[str], None] = None,
     ):
         if identifier is None:
             identifier = f"{type(self).__qualname__}_{hash(self):x}"
@@ -174,6 +411,11 @@ class TerminalWidget(ABC):
         self.tab_stop = tab_stop
         self.scroll_horizontal = scroll_horizontal
         self.scroll_vertical = scroll_vertical
+        # mouse motion without buttons is delivered only to widgets asking for it
+        self.hover_events = hover_events
+        # stylesheet classes, without leading dot
+        # style cache shares attribute with classes, see style
+        self._style = retui.theme.WidgetStyle(tuple(classes) if classes else ())
         # register handlers here
         # when handling click - cache what was there to speed up lookup - invalidate on re-draw
         # iterate in reverse order on widgets - the order on widget list determines Z order
@@ -183,6 +425,8 @@ class TerminalWidget(ABC):
         # internals
         self._redraw = True
         self._update_size = True
+        # some widget in subtree needs layout, this one keeps its dimensions
+        self._update_children = False
 
     def dimensions_copy(self, last: bool):
         """
@@ -249,11 +493,8 @@ class TerminalWidget(ABC):
         dimensions.translate_coordinates(parent_dimensions)
         return dimensions
 
-    def update_dimensions(self):
-        self._update_size = False
-        # update dimensions is separate, so we separate drawing logic, so if one implement own widget
-        # doesn't have to remember to call update_dimensions every time or do it incorrectly
-
+    def calculate_layout(self) -> Rectangle:
+        # NOTE: docked widgets consume parent docked space, so this has to be called for every child in order
         if self.dock is not Dock.NONE:
             dimensions = self.calculate_dimensions_docked()
         else:
@@ -267,10 +508,51 @@ class TerminalWidget(ABC):
             #     y += self.parent.inner_y()
             # elif Alignment.Bottom in self.dock:
             #     y = self.parent.inner_y() + self.parent.inner_height() - height - y
+        return dimensions
+
+    def update_dimensions(self):
+        # update dimensions is separate, so we separate drawing logic, so if one implement own widget
+        # doesn't have to remember to call update_dimensions every time or do it incorrectly
+        self.apply_dimensions(self.calculate_layout())
 
+    def apply_dimensions(self, dimensions: Rectangle):
+        """
+        Stores computed dimensions and lays out whole subtree
+        """
+        self._update_size = False
         self.last_dimensions = dimensions
         self._redraw = True
 
+    def update_dimensions_dirty(self) -> bool:
+        """
+        Incremental layout - subtree is laid out again only if it was invalidated or its dimensions changed.
+        Returns True if anything was laid out.
+        """
+        dimensions = self.calculate_layout()
+        if self._update_size or dimensions != self.last_dimensions:
+            self.apply_dimensions(dimensions)
+            return True
+        return False
+
+    def invalidate_layout(self):
+        """
+        Call after changing dimensions, dock or dimensions flag - only this widget and its siblings are laid out
+        again in next frame, rest of the tree keeps cached dimensions
+        """
+        self._update_size = True
+        if self.parent is not None:
+            self.parent.invalidate_children_layout()
+        if self.app is not None:
+            self.app.request_frame()
+
+    def invalidate_children_layout(self):
+        if self._update_children:
+            # already marked up to the root
+            return
+        self._update_children = True
+        if self.parent is not None:
+            self.parent.invalidate_children_layout()
+
     def dock_add(self, dock: Dock, dimensions: Rectangle) -> bool:
         raise NotImplementedError("You can't dock inside this class")
 
@@ -285,9 +567,80 @@ class TerminalWidget(ABC):
         # raise Exception('handle')
         pass
 
+    def invalidate(self):
+        """
+        Marks widget for redraw, app will draw it in next frame - use instead of setting _redraw
+        """
+        self._redraw = True
+        if self.app is not None:
+            self.app.request_frame()
+
+    @property
+    def classes(self) -> Tuple[str, ...]:
+        return self._style.classes
+
+    @classes.setter
+    def classes(self, classes: List[str]):
+        self._style = retui.theme.WidgetStyle(tuple(classes))
+        self.invalidate()
+
+    def selector(self) -> retui.theme.Selector:
+        return retui.theme.Selector(
+            element_name=type(self).__name__,
+            element_id=f"#{self.identifier}",
+            element_classes=[f".{name}" for name in self._style.classes],
+        )
+
+    @property
+    def style(self) -> retui.theme.Attributes:
+        """
+        Attributes from theme stylesheet, looked up again only after id, classes or stylesheet change.
+        Cache is kept together with classes, one more attribute pushes instance dict past shared keys limit
+        and doubles its size.
+        """
+        return self._style.get(type(self).__name__, self.identifier, retui.theme._APP_THEME.selectors)
+
+    def styled_by(self, names: set) -> bool:
+        """
+        Checks if any of selector names, e.g. "*", ".warning", "#box", applies to the widget
+        """
+        if "*" in names or type(self).__name__ in names or f"#{self.identifier}" in names:
+            return True
+        return any(f".{name}" in names for name in self._style.classes)
+
+    def restyle(self, names: set):
+        """
+        Called after stylesheet rules for selector names changed, widgets they apply to are drawn again
+        """
+        if self.styled_by(names):
+            self.invalidate()
+
     def draw(self, force: bool = False):
         self._redraw = False
 
+    def paint(self):
+        """
+        Puts widget own content into screen buffer, children are not included
+        """
+        pass
+
+    def draw_damaged(self, rect: Rectangle):
+        """
+        Repaints part of widget covered by rect, screen buffer is clipped to it by caller.
+        Pending redraw is left untouched.
+        """
+        self.paint()
+
+    def add_damage(self, rect: Rectangle):
+        """
+        Marks screen area to be repainted by whatever is visible there, e.g. area left by moved widget
+        """
+        if self.app is not None:
+            self.app.add_damage(rect)
+
+    def needs_draw(self) -> bool:
+        return self._redraw
+
     def contains_point(self, column: int, row: int):
         return self.last_dimensions.contains_point(column, row)
 
@@ -320,6 +673,11 @@ class BorderWidget(TerminalWidget):
         self.title = title
         self.border = None
         self._text = None
+        # bumped when own border changes, theme has version of its own
+        self._border_version = 0
+        # rows rendered last time and what they were rendered from
+        self._render_key = None
+        self._render_rows = None
 
         self._inner_dimensions = Rectangle()
         self.docked_dimensions = Rectangle()
@@ -332,8 +690,8 @@ class BorderWidget(TerminalWidget):
             self.set_color(border_color)
         # None implies use theme
 
-    def update_dimensions(self):
-        super().update_dimensions()
+    def apply_dimensions(self, dimensions: Rectangle):
+        super().apply_dimensions(dimensions)
 
         self._inner_dimensions = self.calculate_inner_dimensions()
         self.docked_dimensions = dataclasses.replace(self._inner_dimensions)
@@ -354,67 +712,91 @@ class BorderWidget(TerminalWidget):
 
     def border_from_str(self, border_str: str):
         self.border = retui.theme.Theme.border_from_str(border_str)
+        self._border_version += 1
 
     def set_color(self, color):
         for i in range(0, 9):
             self.border[i].color = color
+        self._border_version += 1
 
     def border_inside_set_color(self, color):
         self.border[ThemePoint.MIDDLE].color = color
+        self._border_version += 1
 
     def border_get_point(self, idx: int):
         return self.border[idx] if self.border else retui.theme._APP_THEME.border[idx]
 
-    def border_get_top(self, width_middle, title):
+    def border_render_top(self, width_middle: int, title) -> List[Span]:
         if title is None:
             title = ""
         top_left = self.border_get_point(ThemePoint.TOP_LEFT)
         top_right = self.border_get_point(ThemePoint.TOP_RIGHT)
         top = self.border_get_point(ThemePoint.TOP)
-        return (
-            self.app.brush.color(top_left.color)
-            + top_left.c
-            + self.app.brush.color(top.color)
-            + ((title[: width_middle - 2] + "..") if len(title) > width_middle else title)
-            + (top.c * (width_middle - len(self.title)))
-            + self.app.brush.color(top_right.color)
-            + top_right.c
-            + self.app.brush.reset_color()
-        )
-
-    def border_get_bottom(self, width_middle):
+        title = (title[: width_middle - 2] + "..") if len(title) > width_middle else title
+        row = []
+        append_span(row, top_left.c, top_left.color)
+        append_span(row, title + (top.c * (width_middle - len(title))), top.color)
+        append_span(row, top_right.c, top_right.color)
+        return row
+
+    def border_render_bottom(self, width_middle: int) -> List[Span]:
         bottom_left = self.border_get_point(ThemePoint.BOTTOM_LEFT)
         bottom_right = self.border_get_point(ThemePoint.BOTTOM_RIGHT)
         bottom = self.border_get_point(ThemePoint.BOTTOM)
-        return (
-            self.app.brush.color(bottom_left.color)
-            + bottom_left.c
-            + self.app.brush.color(bottom.color)
-            + (bottom.c * width_middle)
-            + self.app.brush.color(bottom_right.color)
-            + bottom_right.c
-            + self.app.brush.reset_color()
-        )
+        row = []
+        append_span(row, bottom_left.c, bottom_left.color)
+        append_span(row, bottom.c * width_middle, bottom.color)
+        append_span(row, bottom_right.c, bottom_right.color)
+        return row
 
     def draw(self, force: bool = False):
         if force or self._redraw:
-            self._draw_bordered(inside_text=self._text, title=self.title)
+            self.paint()
             super().draw(force=force)
 
-    def _draw_bordered(self, inside_text: Text = None, title: str = ""):
-        y = self.last_dimensions.y
-        x = self.last_dimensions.x
+    def paint(self):
+        # widget only renders, App.flush diffs screen buffer and writes it out
+        self.app.screen.put_rows(self.last_dimensions.x, self.last_dimensions.y, self.render())
+
+    def render(self) -> List[List[Span]]:
+        """
+        Renders widget into rows of spans, first row is top of last_dimensions.
+        Rows are reused while size, title, text, theme and style stay the same, e.g. on full redraw after resize.
+        """
+        key = self.render_key()
+        if self._render_rows is not None and key == self._render_key:
+            return self._render_rows
+        self._render_rows = self.render_bordered(inside_text=self._text, title=self.title)
+        self._render_key = key
+        return self._render_rows
+
+    def render_key(self) -> tuple:
+        theme = retui.theme._APP_THEME if self.border is None else None
+        text = self._text
+        return (
+            self.last_dimensions.width,
+            self.last_dimensions.height,
+            self.borderless,
+            self.title,
+            text,
+            None if text is None else text.version,
+            self._border_version,
+            theme,
+            None if theme is None else theme.version,
+            self.style,
+        )
+
+    def render_bordered(self, inside_text: Text = None, title: str = "") -> List[List[Span]]:
         width = self.last_dimensions.width
         height = self.last_dimensions.height
         width_inner = width
         if self.borderless is False:
             width_inner -= 2
-        self.app.brush.move_cursor(row=y)
-        offset_str = self.app.brush.str_right(x)
 
+        rows = []
         # Top border
         if self.borderless is False:
-            self.app.brush.print(offset_str + self.border_get_top(width_inner, title), end="")
+            rows.append(self.border_render_top(width_inner, title))
 
         start = 0 if self.borderless else 1
         end = height if self.borderless else (height - 1)
@@ -424,33 +806,32 @@ class BorderWidget(TerminalWidget):
             inside_text.prepare_lines(width=width_inner, height=height_inner)
 
         inside_border = self.border_get_point(ThemePoint.MIDDLE)
+        inside_color = self.style.apply(inside_border.color)
         left_border = None if self.borderless else self.border_get_point(ThemePoint.LEFT)
         right_border = None if self.borderless else self.border_get_point(ThemePoint.RIGHT)
         empty_line = inside_border.c * width_inner
 
         # Middle part
         for h in range(0, height_inner):
-            self.app.brush.move_cursor(row=(y + start + h))
             text = inside_text.get_line(h) if inside_text else empty_line
             leftover = width_inner - len(text)
-            line = offset_str
+            row = []
 
             if self.borderless is False:
-                line += self.app.brush.color(left_border.color) + left_border.c
+                append_span(row, left_border.c, left_border.color)
 
-            line += self.app.brush.color(inside_border.color) + text[:width_inner] + (inside_border.c * leftover)
+            append_span(row, text[:width_inner] + (inside_border.c * leftover), inside_color)
 
             if self.borderless is False:
-                line += self.app.brush.color(right_border.color) + right_border.c
-
-            line += self.app.brush.reset_color()
-            self.app.brush.print(line, end="")
+                append_span(row, right_border.c, right_border.color)
+            rows.append(row)
 
         # Bottom border
         if self.borderless is False:
-            self.app.brush.move_cursor(row=y + height - 1)
-            self.app.brush.print(offset_str + self.border_get_bottom(width_inner), end="\n")
-        pass
+            rows.append(self.border_render_bottom(width_inner))
+
+        # too small to fit both borders
+        return rows[: max(height, 0)]
 
     def local_point(self, point: Tuple[int, int]) -> Union[Tuple[int, int], Tuple[None, None]]:
         # NOTE: this won't return point if we touch border
@@ -495,6 +876,37 @@ class TextBox(BorderWidget):
     @text.setter
     def text(self, new_text):
         self._text = Text(text=new_text, text_align=self.text_align, text_wrap=self.text_wrap)
+        self.invalidate()
+
+    # rows scrolled by single wheel step
+    wheel_step = 3
+
+    def scroll(self, rows: int) -> bool:
+        if self._text.scroll(rows):
+            self.invalidate()
+            return True
+        return False
+
+    def scroll_page(self, pages: int) -> bool:
+        if self._text.scroll_page(pages):
+            self.invalidate()
+            return True
+        return False
+
+    def handle(self, event):
+        # TODO: scroll_horizontal
+        if not self.scroll_vertical:
+            return
+        if isinstance(event, MouseEvent):
+            if event.pressed and event.button == MouseEvent.Buttons.WHEEL_UP:
+                self.scroll(-self.wheel_step)
+            elif event.pressed and event.button == MouseEvent.Buttons.WHEEL_DOWN:
+                self.scroll(self.wheel_step)
+        elif isinstance(event, KeyEvent) and event.key_down:
+            if event.vk_code == VirtualKeyCodes.VK_PRIOR:
+                self.scroll_page(-1)
+            elif event.vk_code == VirtualKeyCodes.VK_NEXT:
+                self.scroll_page(1)
 
     def draw(self, force: bool = False):
         if force or self._redraw:
@@ -507,15 +919,52 @@ class Pane(BorderWidget):
     def from_dict(cls, **kwargs):
         return cls(**kwargs)
 
+    # specs of children constructed on first layout, class level so panes without them don't carry the attribute
+    pending_widgets = None
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.widgets = []
 
     def draw(self, force: bool = False):
-        if force or self._redraw:
+        # children are visited even if pane is clean, one of them may need redraw
+        force = force or self._redraw
+        if force:
             super().draw(force=force)
+        # pane background covered children, so they have to be redrawn as well
+        self.draw_widgets(force=force)
+
+    def needs_draw(self) -> bool:
+        return self._redraw or any(widget.needs_draw() for widget in self.widgets)
+
+    def draw_widgets(self, force: bool = False):
+        screen = self.app.screen
+        # children never paint over border or outside of the pane
+        with screen.clipped(self.inner_dimensions(docked=False)):
+            # later siblings are on top, only the part painted below them has to be painted again
+            damaged = []
             for widget in self.widgets:
-                widget.draw()
+                if force or widget.needs_draw():
+                    widget.draw(force=force)
+                    damaged.append(widget.last_dimensions)
+                    continue
+                for rect in damaged:
+                    area = widget.last_dimensions.intersection(rect)
+                    if not area.empty():
+                        with screen.clipped(area):
+                            widget.draw_damaged(area)
+
+    def draw_damaged(self, rect: Rectangle):
+        self.paint()
+        with self.app.screen.clipped(self.inner_dimensions(docked=False)):
+            for widget in self.widgets:
+                if not widget.last_dimensions.intersection(rect).empty():
+                    widget.draw_damaged(rect)
+
+    def restyle(self, names: set):
+        super().restyle(names)
+        for widget in self.widgets:
+            widget.restyle(names)
 
     def dock_add(self, dock: Dock, dimensions: Rectangle) -> bool:
         if dock is Dock.TOP:
@@ -541,6 +990,30 @@ class Pane(BorderWidget):
         # TODO: fit check
         widget.parent = self
         self.widgets.append(widget)
+        widget.invalidate_layout()
+
+    def add_widget_spec(self, spec):
+        """
+        Adds child constructed only when pane is laid out with non-empty inner area, or when it is looked up by id.
+        spec.create() returns the widget, spec.find(identifier) checks identifiers of it and its children.
+        """
+        if self.pending_widgets is None:
+            self.pending_widgets = []
+        self.pending_widgets.append(spec)
+        if not self._update_size:
+            # already laid out, pick it up in next frame
+            self.invalidate_layout()
+
+    def create_pending_widgets(self) -> list:
+        specs = self.pending_widgets
+        self.pending_widgets = None
+        widgets = []
+        for spec in specs:
+            widget = spec.create()
+            widget.parent = self
+            self.widgets.append(widget)
+            widgets.append(widget)
+        return widgets
 
     def add_widget_after(self, widget: TerminalWidget, widget_on_list: TerminalWidget) -> bool:
         try:
@@ -550,6 +1023,7 @@ class Pane(BorderWidget):
 
         widget.parent = self
         self.widgets.insert(idx + 1, widget)
+        widget.invalidate_layout()
         # TODO ut to check if it will fail if the widget is last widget
         return True
 
@@ -561,14 +1035,53 @@ class Pane(BorderWidget):
 
         widget.parent = self
         self.widgets.insert(idx, widget)
+        widget.invalidate_layout()
         return True
 
-    def update_dimensions(self):
-        super().update_dimensions()
+    def remove_widget(self, widget: TerminalWidget) -> bool:
+        try:
+            self.widgets.remove(widget)
+        except ValueError:
+            return False
 
+        # siblings may take the space, and the area has to be repainted
+        self.invalidate_children_layout()
+        self.add_damage(widget.last_dimensions)
+        if self.app is not None:
+            self.app.widget_removed(widget)
+        widget.parent = None
+        return True
+
+    def apply_dimensions(self, dimensions: Rectangle):
+        super().apply_dimensions(dimensions)
+
+        if self.pending_widgets and not self._inner_dimensions.empty():
+            self.create_pending_widgets()
+        self._update_children = False
         for widget in self.widgets:
             widget.update_dimensions()
 
+    def update_dimensions_dirty(self) -> bool:
+        if super().update_dimensions_dirty():
+            return True
+        if not self._update_children:
+            return False
+        return self.update_children_dimensions_dirty()
+
+    def update_children_dimensions_dirty(self) -> bool:
+        self._update_children = False
+        # children are docked again from scratch, but only changed ones lay out their subtrees
+        self.docked_dimensions = dataclasses.replace(self._inner_dimensions)
+        changed = False
+        for widget in self.widgets:
+            previous = widget.last_dimensions
+            if widget.update_dimensions_dirty():
+                changed = True
+                if widget.last_dimensions != previous:
+                    # child draws itself at new place, only area it left has to be repainted
+                    self.add_damage(previous)
+        return changed
+
     def get_widget(self, column: int, row: int) -> Union[TerminalWidget, None]:
         match = super().get_widget(column, row)
 
@@ -591,6 +1104,12 @@ class Pane(BorderWidget):
             if widget:
                 return widget
 
+        if self.pending_widgets and any(spec.find(identifier) for spec in self.pending_widgets):
+            # constructed ahead of layout, they are laid out in next frame
+            for widget in self.create_pending_widgets():
+                widget.invalidate_layout()
+            return self.get_widget_by_id(identifier)
+
         return None
 
 
@@ -618,7 +1137,7 @@ class Button(TextBox):
     @staticmethod
     def is_click(event):
         if isinstance(event, MouseEvent):
-            if event.button in [event.button.LMB] and event.pressed:
+            if event.button in [event.button.LMB] and event.pressed and not event.hover:
                 return True
         elif isinstance(event, KeyEvent):
             if event.vk_code in [VirtualKeyCodes.VK_RETURN, VirtualKeyCodes.VK_SPACE]:
@@ -637,13 +1156,40 @@ class WriteBox(TextBox):
     def from_dict(cls, **kwargs):
         return cls(**kwargs)
 
-    def __init__(self, **kwargs):
+    def __init__(self, max_lines: int = 0, **kwargs):
+        """
+        Init function
+        :param max_lines: when above 0 text is kept in ring buffer of that many lines, suited for streaming logs
+        :param kwargs see TextBox
+        """
         super().__init__(**kwargs)
+        self.max_lines = max_lines
+        if self.max_lines > 0:
+            self._text = StreamText(
+                max_lines=max_lines, text=self._text.text, text_align=self.text_align, text_wrap=self.text_wrap
+            )
+
+    @property
+    def text(self):
+        return self._text.text
+
+    @text.setter
+    def text(self, new_text):
+        if self.max_lines > 0:
+            self._text.text = new_text
+            self.invalidate()
+        else:
+            TextBox.text.fset(self, new_text)
 
     def write(self, text, append: bool = True):
         if isinstance(text, bytes):
             text = text.decode("utf-8")
-        if append:
+        if self.max_lines > 0:
+            if not append:
+                self._text.clear()
+            self._text.append(text)
+            self.invalidate()
+        elif append:
             self.text += text
         else:
             self.text = text
@@ -678,6 +1224,7 @@ class HorizontalLine(BorderWidget):
     @text.setter
     def text(self, new_text):
         self._text = Text(text=new_text, text_align=self.text_align, text_wrap=self.text_wrap)
+        self.invalidate()
 
     def draw(self, force: bool = False):
         if force or self._redraw:
@@ -0,0 +1,43 @@
+import io
+import os
+
+from retui import Brush
+from retui.base import Color, ColorBits, TerminalColor
+
+
+def test_frame_writes_once_at_end():
+    output = io.StringIO()
+    brush = Brush(file=output)
+    with brush.frame():
+        brush.move_cursor(1, 2)
+        brush.print("text")
+        with brush.frame():
+            brush.cursor_hide()
+        assert output.getvalue() == ""
+    assert output.getvalue() == "\x1B[2;3Htext\x1b[?25l"
+
+
+def test_frame_single_os_write():
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(write_fd, "w", encoding="utf-8") as f:
+        brush = Brush(file=f)
+        with brush.frame():
+            for row in range(0, 10):
+                brush.move_cursor(row, 0)
+                brush.print("│ line │")
+        data = os.read(read_fd, 4096).decode("utf-8")
+    os.close(read_fd)
+    assert data.count("│ line │") == 10
+
+
+def test_color_minimal_delta():
+    brush = Brush(file=io.StringIO())
+    cyan = Color(14, ColorBits.BIT_8)
+    blue = Color(4, ColorBits.BIT_8)
+    assert brush.color(TerminalColor(cyan, blue)) == "\x1B[38;5;14;48;5;4m"
+    assert brush.color(TerminalColor(cyan, blue)) == ""
+    # only background changes, no reset
+    assert brush.color(TerminalColor(cyan, Color(2, ColorBits.BIT_8))) == "\x1B[48;5;2m"
+    assert brush.color(TerminalColor(Color(10, ColorBits.BIT_24), Color.default())) == "\x1B[38;2;10;49m"
+    assert brush.color(TerminalColor()) == "\x1B[39m"
+    assert (cyan, blue, cyan, Color(2, ColorBits.BIT_8)) in Brush._transitions
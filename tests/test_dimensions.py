@@ -35,6 +35,15 @@ class MockApp:
         """
         return dataclasses.replace(self.last_dimensions if last else self.dimensions)
 
+    def request_frame(self):
+        pass
+
+    def add_damage(self, rect: Rectangle):
+        pass
+
+    def invalidate_children_layout(self):
+        pass
+
     def inner_dimensions(self, docked: bool) -> Rectangle:
         if docked:
             return self.docked_dimensions
@@ -112,3 +121,56 @@ def test_sample_main(handle_sigint=True, demo_time_s=None, title=None):
 
     app.update_dimensions()
     child_print(app)
+
+
+def test_incremental_layout():
+    app = MockApp(dimensions=Rectangle(0, 0, 100, 100), widgets=[])
+
+    root = Pane(app=app, dock=Dock.FILL)
+    app.add_widget(root)
+
+    top = TextBox(app=app, x=0, y=0, height=10, width=20, dock=Dock.TOP)
+    root.add_widget(top)
+    left = Pane(app=app, x=0, y=0, height=20, width=30, dock=Dock.LEFT)
+    root.add_widget(left)
+    nested = TextBox(app=app, x=1, y=1, height=3, width=10, dock=Dock.NONE)
+    left.add_widget(nested)
+    static = Pane(app=app, x=40, y=40, height=10, width=10, dock=Dock.NONE)
+    root.add_widget(static)
+
+    app.update_dimensions()
+    assert not root._update_children
+
+    laid_out = []
+    for widget in (left, nested, static):
+        widget.apply_dimensions = (lambda w, f: lambda d: (laid_out.append(w), f(d)))(widget, widget.apply_dimensions)
+
+    top.dimensions.height = 5
+    top.invalidate_layout()
+    assert root._update_children
+
+    assert root.update_dimensions_dirty()
+    # left is docked below top, so it moved - static one kept cached layout
+    assert laid_out == [left, nested]
+    assert top.last_dimensions.height == 5
+    assert left.last_dimensions.y == top.last_dimensions.y_end()
+    assert nested.last_dimensions.y == left.last_dimensions.y + 2
+
+    laid_out.clear()
+    assert not root.update_dimensions_dirty()
+    assert laid_out == []
+
+
+def test_translate_coordinates_trims_to_parent():
+    parent = Rectangle(10, 5, 20, 10)
+    inside = Rectangle(2, 2, 5, 5)
+    inside.translate_coordinates(parent)
+    assert inside == Rectangle(12, 7, 5, 5)
+
+    overflowing = Rectangle(15, 8, 10, 10)
+    overflowing.translate_coordinates(parent)
+    assert overflowing == Rectangle(25, 13, 5, 2)
+
+    outside = Rectangle(25, 12, 4, 4)
+    outside.translate_coordinates(parent)
+    assert outside.empty() and outside.x == 35 and outside.y == 17
@@ -0,0 +1,171 @@
+import asyncio
+import io
+import types
+
+import retui.theme
+from retui import App, Brush
+from retui.base import Color, ColorBits, Rectangle, Span, TerminalColor
+from retui.terminal import ScreenBuffer
+from retui.widgets import Pane, TerminalWidget, TextBox
+
+
+class RecordingWidget(TerminalWidget):
+    def __init__(self, app, name, drawn, rect):
+        super().__init__(app=app)
+        self.name = name
+        self.drawn = drawn
+        self.last_dimensions = rect
+        self._redraw = False
+
+    def draw(self, force: bool = False):
+        if force or self._redraw:
+            self.drawn.append(self.name)
+        super().draw(force=force)
+
+    def draw_damaged(self, rect: Rectangle):
+        self.drawn.append((self.name, rect))
+
+
+class ScreenApp:
+    def __init__(self):
+        self.screen = ScreenBuffer(40, 10)
+
+    def request_frame(self):
+        pass
+
+
+def test_overlapping_sibling_redrawn():
+    drawn = []
+    app = ScreenApp()
+    pane = Pane(app=app, borderless=True)
+    pane._redraw = False
+    below = RecordingWidget(app, "below", drawn, Rectangle(0, 0, 10, 5))
+    above = RecordingWidget(app, "above", drawn, Rectangle(5, 2, 10, 5))
+    aside = RecordingWidget(app, "aside", drawn, Rectangle(20, 0, 5, 5))
+    pane.widgets = [below, above, aside]
+
+    below._redraw = True
+    pane.draw()
+    # only part of above covering redrawn one is repainted
+    assert drawn == ["below", ("above", Rectangle(5, 2, 5, 3))]
+
+    drawn.clear()
+    pane.draw()
+    assert drawn == []
+
+
+def test_render_failure_stops_app():
+    app = App.__new__(App)
+    app.running = True
+    app.loop = None
+    app.events = asyncio.Queue()
+
+    async def run():
+        app.loop = asyncio.get_running_loop()
+
+        async def failing():
+            raise RuntimeError("draw failed")
+
+        task = app.loop.create_task(failing())
+        task.add_done_callback(app.render_done)
+        await asyncio.gather(task, return_exceptions=True)
+        # callback is scheduled after task completes
+        return await asyncio.wait_for(app.events.get(), 1)
+
+    assert asyncio.run(run()) is None
+    assert app.running is False
+
+
+def test_render_merges_same_color_runs():
+    box = TextBox(app=None, text="hi", border_str="+-+| |+-+")
+    box.last_dimensions = Rectangle(2, 1, 6, 3)
+    rows = box.render()
+    # border and inside share default color, each row is a single span
+    assert rows == [
+        [Span("+----+", TerminalColor())],
+        [Span("|hi  |", TerminalColor())],
+        [Span("+----+", TerminalColor())],
+    ]
+
+    color = TerminalColor(Color(1, ColorBits.BIT_8))
+    box.border_inside_set_color(color)
+    assert box.render()[1] == [Span("|", TerminalColor()), Span("hi  ", color), Span("|", TerminalColor())]
+
+    screen = ScreenBuffer(10, 5)
+    screen.put_rows(box.last_dimensions.x, box.last_dimensions.y, box.render())
+    assert "".join(screen.back_chars[2]) == "  |hi  |  "
+
+
+def test_render_cache_reused_until_content_changes():
+    box = TextBox(app=None, text="hi")
+    box.last_dimensions = Rectangle(0, 0, 6, 3)
+    rows = box.render()
+    assert box.render() is rows
+
+    box.text = "ho"
+    rows_text = box.render()
+    assert rows_text is not rows and "ho" in "".join(span.text for span in rows_text[1])
+
+    retui.theme._APP_THEME.border_inside_set_color(retui.theme._APP_THEME.border[0].color)
+    assert box.render() is not rows_text
+
+    rows = box.render()
+    box.last_dimensions = Rectangle(4, 4, 6, 3)
+    # moving doesn't change rendered rows
+    assert box.render() is rows
+    box.last_dimensions = Rectangle(4, 4, 7, 3)
+    assert box.render() is not rows
+
+
+def test_moved_widget_repaints_only_damage():
+    app = App.__new__(App)
+    app.app = app
+    app.screen = ScreenBuffer(30, 10)
+    app.brush = Brush(file=io.StringIO())
+    app.terminal = types.SimpleNamespace(rows=10)
+    app.last_dimensions = Rectangle(0, 0, 30, 10)
+    app._inner_dimensions = Rectangle(0, 0, 30, 10)
+    app.widgets = []
+    app.damage = []
+    app._redraw = False
+    app.request_frame = lambda: None
+
+    background = TextBox(app=app, text="", border_str="+-+|.|+-+")
+    background.last_dimensions = Rectangle(0, 0, 30, 10)
+    floating = TextBox(app=app, text="", border_str="#=#I I#=#")
+    floating.last_dimensions = Rectangle(2, 2, 6, 3)
+    app.widgets = [background, floating]
+    app.draw(force=True)
+    assert "".join(app.screen.back_chars[2][:10]) == "| #====#  "
+
+    repainted = []
+    background.draw = lambda force=False: repainted.append("full")
+    draw_damaged = background.draw_damaged
+    background.draw_damaged = lambda rect: (repainted.append(rect), draw_damaged(rect))
+
+    floating.last_dimensions = Rectangle(10, 2, 6, 3)
+    floating.invalidate()
+    app.add_damage(Rectangle(2, 2, 6, 3))
+    app.draw()
+    assert repainted == [Rectangle(2, 2, 6, 3)]
+    assert "".join(app.screen.back_chars[2][:18]) == "|         #====#  "
+    assert app.damage == []
+
+
+def test_child_clipped_to_parent_inner_area():
+    app = ScreenApp()
+    pane = Pane(app=app, border_str="+-+| |+-+")
+    pane.last_dimensions = Rectangle(0, 0, 8, 4)
+    pane._inner_dimensions = pane.calculate_inner_dimensions()
+    child = TextBox(app=app, text="overflowing", border_str="#=#I I#=#")
+    child.last_dimensions = Rectangle(3, 1, 10, 5)
+    pane.widgets = [child]
+    pane.draw(force=True)
+    rows = ["".join(app.screen.back_chars[y][:14]) for y in range(0, 5)]
+    assert rows == [
+        "+------+      ",
+        "|  #===|      ",
+        "|  Iove|      ",
+        "+------+      ",
+        "              ",
+    ]
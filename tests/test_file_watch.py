@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from retui.file_watch import FileWatcher
+
+
+async def wait_for_change(watcher: FileWatcher, path, write):
+    changed = asyncio.Event()
+    seen = []
+
+    def callback(changed_path):
+        seen.append(changed_path)
+        changed.set()
+
+    watcher.watch(path, callback)
+    loop = asyncio.get_running_loop()
+    watcher.start(loop)
+    try:
+        write()
+        await asyncio.wait_for(changed.wait(), 5)
+    finally:
+        watcher.stop(loop)
+    return seen
+
+
+@pytest.mark.parametrize(
+    "use_inotify",
+    [
+        pytest.param(True, marks=pytest.mark.skipif(not sys.platform.startswith("linux"), reason="linux only")),
+        False,
+    ],
+)
+def test_file_change_reported(tmp_path, use_inotify):
+    css = tmp_path / "theme.css"
+    css.write_text("* {}")
+    other = tmp_path / "other.css"
+    watcher = FileWatcher(poll_interval_s=0.01, use_inotify=use_inotify)
+
+    def write():
+        other.write_text("* {}")
+        # replaced like editors do, rename lands as IN_MOVED_TO
+        replacement = tmp_path / "theme.css.tmp"
+        replacement.write_text(".a { color: #000001; }")
+        os.replace(replacement, css)
+
+    seen = asyncio.run(wait_for_change(watcher, css, write))
+    assert seen == [str(css)]
+    if use_inotify:
+        assert watcher.fd == -1 and not watcher.directories
+
+
+def test_unchanged_file_not_reported(tmp_path):
+    css = tmp_path / "theme.css"
+    css.write_text("* {}")
+    seen = []
+    watcher = FileWatcher()
+    watcher.watch(css, seen.append)
+    watcher.check()
+    assert seen == []
+    css.write_text("* { color: #000001; }")
+    watcher.check()
+    watcher.check()
+    assert seen == [str(css)]
+
+
+def test_started_only_when_file_watched(tmp_path):
+    css = tmp_path / "theme.css"
+    css.write_text("* {}")
+    watcher = FileWatcher()
+
+    async def start_then_watch():
+        loop = asyncio.get_running_loop()
+        watcher.start(loop)
+        started_empty = watcher.fd >= 0 or watcher.poll_task is not None
+        watcher.watch(css, lambda path: None)
+        started = watcher.fd >= 0 or watcher.poll_task is not None
+        watcher.stop(loop)
+        return started_empty, started
+
+    assert asyncio.run(start_then_watch()) == (False, True)
+    assert watcher.fd == -1 and watcher.poll_task is None
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from retui import App
+from retui.enums import Dock
+from retui.input_handling import KeyEvent, MouseEvent
+from retui.input_handling.enums import VirtualKeyCodes
+from retui.terminal.headless import HeadlessTerminal, VirtualScreen
+from retui.widgets import Button, Pane, TextBox
+
+
+def make_app(columns=20, rows=6):
+    terminal = HeadlessTerminal(columns=columns, rows=rows)
+    app = App(terminal=terminal)
+    box = TextBox(app=app, x=1, y=1, width=8, height=3, dock=Dock.NONE, text="hi", border_str="+-+| |+-+")
+    app.add_widget(box)
+    app.clear(reuse=False)
+    app.render_frame()
+    return app, terminal, box
+
+
+def test_rendered_output_parsed_into_grid():
+    app, terminal, box = make_app()
+    assert terminal.lines() == [
+        "                    ",
+        " +------+           ",
+        " |hi    |           ",
+        " +------+           ",
+        "                    ",
+        "                    ",
+    ]
+
+    box.text = "ho"
+    app.render_frame()
+    output = terminal.take_output()
+    # only changed cell is written
+    assert "ho" not in output and "o" in output
+    assert terminal.virtual_screen.lines()[2] == " |ho    |           "
+
+
+def test_resize_and_scripted_input():
+    app, terminal, box = make_app()
+    received = []
+
+    def handle(event):
+        received.append(event)
+        if isinstance(event, KeyEvent):
+            app.running = False
+
+    box.handle = handle
+    terminal.resize(30, 8)
+    terminal.feed([MouseEvent(2, 2, MouseEvent.Buttons.LMB, True, 0, False)])
+    terminal.feed([KeyEvent(True, 1, VirtualKeyCodes.VK_RETURN, 0, b"\r", "\r", 0)])
+    app.init_asyncio()
+    app.running = True
+    asyncio.run(app.main_loop())
+
+    assert [type(event) for event in received] == [MouseEvent, KeyEvent]
+    assert app.screen.width == 30 and app.screen.height == 7
+    app.render_frame()
+    assert terminal.lines()[2] == " |hi    |" + " " * 21
+
+
+def test_invalidations_coalesced_into_capped_frames():
+    app, terminal, box = make_app()
+    app.max_fps = 20
+    frames = []
+    render_frame = app.render_frame
+
+    def record_frame():
+        frames.append(app.loop.time())
+        render_frame()
+
+    app.render_frame = record_frame
+    after_burst = []
+
+    async def invalidate():
+        for _ in range(100):
+            app.invalidate()
+        await asyncio.sleep(0.01)
+        after_burst.append(len(frames))
+        end = app.loop.time() + 0.3
+        while app.loop.time() < end:
+            app.invalidate()
+            box.text = str(app.loop.time())
+            await asyncio.sleep(0.001)
+        app.running = False
+        app.wake()
+
+    app.register_tasks = lambda: app.create_task(invalidate())
+    app.init_asyncio()
+    app.running = True
+    asyncio.run(app.main_loop())
+
+    # burst within one tick is drawn once
+    assert after_burst == [1]
+    intervals = [later - earlier for earlier, later in zip(frames, frames[1:])]
+    assert len(frames) >= 3
+    # loop clock may wake sleep slightly early
+    assert min(intervals) >= 1 / 20 - 0.005
+
+
+@pytest.mark.parametrize("nested", [False, True])
+def test_removed_widget_gets_no_input(nested):
+    app, terminal, box = make_app()
+    clicks = []
+    parent = app
+    if nested:
+        parent = Pane(app=app, x=10, y=0, width=10, height=5, dock=Dock.NONE, borderless=True)
+        app.add_widget(parent)
+    button = Button(
+        app=app,
+        x=0 if nested else 10,
+        y=1,
+        width=8,
+        height=3,
+        dock=Dock.NONE,
+        text="ok",
+        click_handler=lambda this: clicks.append(this),
+    )
+    parent.add_widget(button)
+    app.render_frame()
+
+    click = MouseEvent(11, 2, MouseEvent.Buttons.LMB, True, 0, False)
+    app.handle_events([click])
+    assert clicks == [button] and app.focused_widget is button
+
+    parent.remove_widget(button)
+    app.render_frame()
+    assert app.widget_index.get(11, 2) is not button
+    assert app.focused_widget is None
+    app.handle_events([click, KeyEvent(True, 1, VirtualKeyCodes.VK_RETURN, 0, b"\r", "\r", 0)])
+    assert clicks == [button]
+
+
+def test_virtual_screen_colors_and_wrap():
+    screen = VirtualScreen(4, 2)
+    screen.feed("\x1b[38;5;14;48;5;4mab\x1b[49mcdef")
+    assert screen.lines() == ["abcd", "ef  "]
+    assert screen.color_at(0, 0) == ("5;14", "5;4")
+    assert screen.color_at(2, 0) == ("5;14", None)
@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+
+from retui import App
+from retui.input_handling import EventPool, InputInterpreter, KeyEvent, MouseEvent, TextEvent
+from retui.input_handling.enums import VirtualKeyCodes
+from retui.input_handling.windows import MOUSE_EVENT_RECORD
+
+
+class Pipe:
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+
+    def fileno(self):
+        return self.read_fd
+
+    def write(self, data: str):
+        os.write(self.write_fd, data.encode("utf-8"))
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+def read_all(data: str):
+    pipe = Pipe()
+    try:
+        interpreter = InputInterpreter(pipe)
+        pipe.write(data)
+        return list(interpreter.read_ready() or [])
+    finally:
+        pipe.close()
+
+
+def test_keys_and_mouse():
+    events = read_all("a\x1b[A\x1b[<0;5;7M\x1b[6~\r")
+    assert [type(event) for event in events] == [KeyEvent, KeyEvent, MouseEvent, KeyEvent, KeyEvent]
+    assert events[0].wchar == "a" and events[0].vk_code == VirtualKeyCodes.VK_KEY_A
+    assert events[1].vk_code == VirtualKeyCodes.VK_UP
+    assert events[2].coordinates == (4, 6) and events[2].pressed
+    assert events[3].vk_code == VirtualKeyCodes.VK_NEXT
+    assert events[4].vk_code == VirtualKeyCodes.VK_RETURN
+
+
+def test_mouse_modifiers_and_unknown_buttons():
+    # shift+lmb, meta+ctrl+rmb, then extra button 8 which has no meaning here
+    events = read_all("\x1b[<4;7;8M\x1b[<26;7;8m\x1b[<128;7;8Mz")
+    assert [type(event) for event in events] == [MouseEvent, MouseEvent, KeyEvent]
+    assert events[0].button == MouseEvent.Buttons.LMB and events[0].pressed
+    assert events[0].control_key_state == MouseEvent.ControlKeys.SHIFT.value
+    assert events[1].button == MouseEvent.Buttons.RMB and not events[1].pressed
+    assert events[1].control_key_state == (MouseEvent.ControlKeys.LEFT_ALT | MouseEvent.ControlKeys.LEFT_CTRL).value
+    assert events[2].wchar == "z"
+
+
+def test_sequence_split_between_reads():
+    pipe = Pipe()
+    try:
+        interpreter = InputInterpreter(pipe)
+        pipe.write("x\x1b[<0;1")
+        events = list(interpreter.read_ready())
+        assert len(events) == 1 and events[0].wchar == "x"
+        pipe.write("0;12m")
+        events = list(interpreter.read_ready())
+        assert len(events) == 1 and events[0].coordinates == (9, 11) and not events[0].pressed
+    finally:
+        pipe.close()
+
+
+def test_paste_is_coalesced():
+    text = "pasted text; " * 8000
+    interpreter_input = "\x1b[<0;3;3M" + text
+    pipe = Pipe()
+    try:
+        interpreter = InputInterpreter(pipe)
+        # paste is bigger than pipe buffer
+        writer = threading.Thread(target=pipe.write, args=(interpreter_input,))
+        writer.start()
+        events = []
+        elapsed = 0.0
+        while writer.is_alive() or interpreter.selector.select(0):
+            if not interpreter.selector.select(0.1):
+                continue
+            start = time.perf_counter()
+            events.extend(interpreter.read_ready() or [])
+            elapsed += time.perf_counter() - start
+        writer.join()
+    finally:
+        pipe.close()
+    assert isinstance(events[0], MouseEvent)
+    assert all(isinstance(event, TextEvent) for event in events[1:])
+    assert "".join(event.text for event in events[1:]) == text
+    assert elapsed < 0.5
+
+
+def test_lone_escape_is_delivered():
+    events = read_all("\x1b")
+    assert len(events) == 1 and events[0].vk_code == VirtualKeyCodes.VK_ESCAPE
+
+
+class FocusedWidget:
+    def __init__(self):
+        self.events = []
+
+    def handle(self, event):
+        self.events.append(event)
+
+
+def test_text_event_goes_to_focused_widget():
+    # only event routing is exercised, no terminal needed
+    app = App.__new__(App)
+    app.debug = False
+    app.focused_widget = FocusedWidget()
+    events = read_all("typed fast\x1b[B")
+    app.handle_events([events])
+    assert [type(event) for event in app.focused_widget.events] == [TextEvent, KeyEvent]
+    assert app.focused_widget.events[0].text == "typed fast"
+
+
+def test_mouse_motion_coalesced():
+    sweep = "".join(f"\x1b[<35;{x};5M" for x in range(1, 60))
+    drag = "".join(f"\x1b[<32;{x};6M" for x in range(1, 10))
+    events = read_all(sweep + "\x1b[<0;60;5M" + sweep + "\x1b[<64;3;3M" + drag + "\x1b[<0;9;6m")
+    assert [(event.button, event.hover, event.coordinates) for event in events] == [
+        (MouseEvent.Buttons.NONE, True, (58, 4)),
+        (MouseEvent.Buttons.LMB, False, (59, 4)),
+        (MouseEvent.Buttons.NONE, True, (58, 4)),
+        (MouseEvent.Buttons.WHEEL_UP, False, (2, 2)),
+        (MouseEvent.Buttons.LMB, True, (8, 5)),
+        (MouseEvent.Buttons.LMB, False, (8, 5)),
+    ]
+    assert not events[0].pressed and not events[-1].pressed
+
+
+def test_event_pool_reuses_events():
+    pool = EventPool()
+    pipe = Pipe()
+    try:
+        interpreter = InputInterpreter(pipe, pool)
+        pipe.write("a\x1b[<0;5;7M")
+        first = list(interpreter.read_ready())
+        pool.release([first])
+        pipe.write("\x1b[<0;8;9mb")
+        second = list(interpreter.read_ready())
+    finally:
+        pipe.close()
+    assert second[0] is first[1] and second[1] is first[0]
+    assert second[0].coordinates == (7, 8) and not second[0].pressed
+    assert second[1].wchar == "b"
+
+
+def test_windows_mouse_record_appends_to_batch():
+    record = MOUSE_EVENT_RECORD()
+    record.dwMousePosition.X = 3
+    record.dwMousePosition.Y = 4
+    record.dwEventFlags = 0x1
+    events = ["before"]
+    assert MouseEvent.from_windows_event(record, events) is events
+    record.dwMousePosition.X = 5
+    MouseEvent.from_windows_event(record, events)
+    assert events[0] == "before" and len(events) == 2
+    assert events[1].coordinates == (5, 4) and events[1].button == MouseEvent.Buttons.NONE
@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from retui import json_loader
+from retui.enums import Dock, TextAlign
+from retui.terminal.headless import HeadlessTerminal
+from retui.widgets import Pane, TextBox
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data))
+    return path
+
+
+def box(identifier, x, y, **kwargs):
+    return dict(id=identifier, type="TextBox", x=x, y=y, width=10, height=3, dock="NONE", text=identifier, **kwargs)
+
+
+@pytest.fixture
+def layout(tmp_path):
+    (tmp_path / "parts").mkdir()
+    write_json(
+        tmp_path / "parts" / "pane.json",
+        {"widgets": [box("inner1", 0, 0), {"include": "more.json"}]},
+    )
+    write_json(tmp_path / "parts" / "more.json", [box("inner2", 0, 3)])
+    return write_json(
+        tmp_path / "app.json",
+        {
+            "name": "app",
+            "color": False,
+            "widgets": [
+                box("top", 0, 0),
+                {"id": "pane", "type": "Pane", "x": 12, "y": 0, "width": 14, "height": 8, "dock": "NONE"},
+                {"include": "parts/pane.json", "parent_id": "pane"},
+                {"id": "hidden", "type": "Pane", "x": 0, "y": 5, "width": 0, "height": 0, "dock": "NONE"},
+                box("never", 0, 0, parent_id="hidden"),
+            ],
+        },
+    )
+
+
+def load(layout, lazy):
+    return json_loader.app_from_json(layout, terminal=HeadlessTerminal(columns=30, rows=10), lazy=lazy)
+
+
+def test_include_places_widgets_under_parent(layout):
+    app = load(layout, lazy=False)
+    pane = app.get_widget_by_id("pane")
+    assert [widget.identifier for widget in pane.widgets] == ["inner1", "inner2"]
+    assert isinstance(pane.widgets[1], TextBox)
+
+
+def test_include_cycle(tmp_path):
+    write_json(tmp_path / "a.json", {"name": "a", "widgets": [{"include": "b.json"}]})
+    write_json(tmp_path / "b.json", [{"include": "a.json"}])
+    with pytest.raises(Exception, match="Include cycle"):
+        json_loader.app_from_json(tmp_path / "a.json", terminal=HeadlessTerminal())
+
+
+def test_lazy_constructs_on_layout(layout):
+    app = load(layout, lazy=True)
+    assert app.widgets == [] and len(app.pending_widgets) == 3
+
+    app.clear(reuse=False)
+    app.render_frame()
+    pane = app.widgets[1]
+    assert isinstance(pane, Pane)
+    assert [widget.identifier for widget in pane.widgets] == ["inner1", "inner2"]
+    # pane without inner area never shows its children, they are not constructed
+    hidden = app.widgets[2]
+    assert hidden.widgets == [] and len(hidden.pending_widgets) == 1
+
+    assert app.get_widget_by_id("never").identifier == "never"
+    assert hidden.pending_widgets is None and hidden.widgets[0].parent is hidden
+
+
+def test_lazy_looked_up_before_layout(layout):
+    app = load(layout, lazy=True)
+    widget = app.get_widget_by_id("inner2")
+    assert widget.text == "inner2"
+    assert widget.parent.identifier == "pane"
+
+
+def test_lazy_renders_like_eager(layout):
+    screens = []
+    for lazy in (False, True):
+        app = load(layout, lazy=lazy)
+        app.clear(reuse=False)
+        app.render_frame()
+        screens.append(app.terminal.lines())
+    assert screens[0] == screens[1]
+    assert "inner2" in screens[1][5]
+
+
+def test_layout_cache_used_until_source_changes(layout, monkeypatch):
+    load(layout, lazy=False)
+    assert layout.with_name("app.json" + json_loader.LAYOUT_CACHE_SUFFIX).exists()
+
+    # cached layout is built without compiling
+    with monkeypatch.context() as patch:
+        patch.setattr(json_loader, "compile_layout", None)
+        app = load(layout, lazy=False)
+    assert isinstance(app.get_widget_by_id("pane"), Pane)
+    assert app.get_widget_by_id("inner2").text == "inner2"
+
+    # included file changed
+    write_json(layout.parent / "parts" / "more.json", [box("changed", 0, 3)])
+    app = load(layout, lazy=False)
+    assert app.get_widget_by_id("inner2") is None
+    assert app.get_widget_by_id("changed").parent.identifier == "pane"
+
+
+def test_layout_cache_resolves_mappings_on_build(tmp_path):
+    layout = write_json(
+        tmp_path / "app.json",
+        {
+            "name": "app",
+            "widgets": [
+                dict(box("greeting", 0, 0), text="__test#greeting", text_align="MIDDLE_CENTER", dock="__test#dock"),
+            ],
+            "post_callbacks": [{"function": "__test#post", "args": ["##this"]}],
+        },
+    )
+    built = []
+    for greeting in ("hello", "hi"):
+        app = json_loader.app_from_json(
+            layout,
+            terminal=HeadlessTerminal(),
+            app_dict_name="test",
+            app_dict={"greeting": greeting, "dock": "FILL", "post": built.append},
+        )
+        widget = app.get_widget_by_id("greeting")
+        assert widget.text == greeting
+        assert widget.dock is Dock.FILL
+        assert widget.text_align is TextAlign.MIDDLE_CENTER
+    assert len(built) == 2 and built[1] is app
+
+
+def test_broken_layout_cache_is_replaced(layout):
+    cache = layout.with_name("app.json" + json_loader.LAYOUT_CACHE_SUFFIX)
+    cache.write_bytes(b"not a pickle")
+    app = load(layout, lazy=True)
+    assert app.get_widget_by_id("inner1").text == "inner1"
+    assert cache.read_bytes() != b"not a pickle"
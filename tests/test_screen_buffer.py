@@ -0,0 +1,61 @@
+import types
+
+from retui import App
+from retui.base import Color, ColorBits, TerminalColor
+from retui.terminal import ScreenBuffer
+
+
+def test_fresh_buffer_has_no_diff():
+    screen = ScreenBuffer(10, 3)
+    assert list(screen.diff()) == []
+
+
+def test_diff_single_cell():
+    screen = ScreenBuffer(10, 3)
+    screen.put(4, 1, "x", screen.default_color)
+    assert list(screen.diff()) == [(1, 4, 5)]
+
+    screen.commit(1, 4, 5)
+    assert list(screen.diff()) == []
+
+
+def test_diff_merges_close_changes():
+    screen = ScreenBuffer(20, 1)
+    screen.put(0, 0, "a", screen.default_color)
+    screen.put(3, 0, "b", screen.default_color)
+    screen.put(15, 0, "c", screen.default_color)
+    assert list(screen.diff()) == [(0, 0, 4), (0, 15, 16)]
+
+
+def test_put_clips_to_screen():
+    screen = ScreenBuffer(5, 2)
+    screen.put(-2, 0, "abcdefgh", screen.default_color)
+    screen.put(3, 1, "xyz", screen.default_color)
+    screen.put(0, 2, "out", screen.default_color)
+    assert "".join(screen.back_chars[0]) == "cdefg"
+    assert "".join(screen.back_chars[1]) == "   xy"
+
+
+def test_spans_split_on_color():
+    color = TerminalColor(Color(1, ColorBits.BIT_8), Color(2, ColorBits.BIT_8))
+    screen = ScreenBuffer(6, 1)
+    screen.put(0, 0, "ab", color)
+    screen.put(2, 0, "cd", screen.default_color)
+    assert list(screen.spans(0, 0, 4)) == [("ab", color), ("cd", screen.default_color)]
+
+
+def test_invalidate_repaints_everything():
+    screen = ScreenBuffer(4, 2)
+    screen.invalidate()
+    assert list(screen.diff()) == [(0, 0, 4), (1, 0, 4)]
+
+
+def test_debug_print_goes_through_screen_buffer():
+    app = App.__new__(App)
+    app.debug = True
+    app.debug_colors = TerminalColor()
+    app.terminal = types.SimpleNamespace(rows=5)
+    app.screen = ScreenBuffer(10, 5)
+    app.request_frame = lambda: None
+    app.debug_print("debug\ntext", row_off=-2)
+    assert "".join(app.screen.back_chars[3]) == "debug text"
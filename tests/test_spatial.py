@@ -0,0 +1,49 @@
+from retui.base import Rectangle
+from retui.spatial import SpanIndex
+from retui.widgets import Pane, TextBox
+
+
+def make(cls, parent, x, y, width, height):
+    widget = cls(app=None)
+    widget.last_dimensions = Rectangle(x, y, width, height)
+    if parent:
+        parent.add_widget(widget)
+    return widget
+
+
+def test_index_matches_get_widget():
+    root = make(Pane, None, 0, 0, 40, 20)
+    left = make(Pane, root, 0, 0, 20, 20)
+    make(TextBox, left, 2, 2, 10, 4)
+    # overflows parent, has to be clipped
+    make(TextBox, left, 15, 10, 10, 3)
+    right = make(Pane, root, 18, 5, 22, 10)
+    make(TextBox, right, 20, 6, 5, 5)
+    # floating one covering both panes
+    make(TextBox, root, 10, 8, 15, 4)
+
+    index = SpanIndex()
+    index.rebuild(root)
+
+    for y in range(-1, 22):
+        for x in range(-1, 42):
+            assert index.get(x, y) is root.get_widget(x, y), (x, y)
+
+
+def test_add_splits_spans():
+    index = SpanIndex()
+    index.add(Rectangle(0, 0, 10, 1), "a")
+    index.add(Rectangle(3, 0, 2, 1), "b")
+    assert [index.get(x, 0) for x in range(0, 11)] == ["a"] * 3 + ["b"] * 2 + ["a"] * 5 + [None]
+    assert len(index.rows[0][0]) == 3
+
+
+def test_hover_subscription():
+    root = make(Pane, None, 0, 0, 10, 10)
+    box = make(TextBox, root, 1, 1, 3, 3)
+    index = SpanIndex()
+    index.rebuild(root)
+    assert not index.hover
+    box.hover_events = True
+    index.rebuild(root)
+    assert index.hover
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+from collections import deque
+
+import pytest
+
+from retui import App
+from retui.input_handling import InputInterpreter, KeyEvent
+from retui.terminal.base import SizeChangeEvent, Terminal
+
+
+class BlockingTerminal(Terminal):
+    """
+    Read blocks until woken up, like console read on windows
+    """
+
+    def __init__(self):
+        super().__init__(None)
+        self.woken = threading.Event()
+        self.reads = 0
+
+    @staticmethod
+    def get_size():
+        return 20, 5
+
+    def interactive_mode(self):
+        pass
+
+    def read_events(self, callback, callback_ctx) -> bool:
+        self.reads += 1
+        if self.reads == 1:
+            callback(callback_ctx, ["first"])
+            return True
+        self.woken.wait()
+        # read in progress while app ends
+        callback(callback_ctx, ["late"])
+        return True
+
+    def wake_reader(self):
+        self.woken.set()
+
+
+def test_reader_thread_stopped_with_loop():
+    terminal = BlockingTerminal()
+
+    async def read_one():
+        queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        terminal.start_reading(loop, queue)
+        events = await queue.get()
+        thread = terminal._reader_thread
+        terminal.stop_reading(loop)
+        return events, thread
+
+    events, thread = asyncio.run(read_one())
+    assert events == ["first"]
+    assert not thread.is_alive() and terminal._reader_thread is None
+
+    # events read after loop was closed are dropped
+    loop = asyncio.new_event_loop()
+    loop.close()
+    Terminal.queue_events_callback((loop, asyncio.Queue()), ["late"])
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="linux only")
+def test_main_loop_reads_stdin_and_window_changes(monkeypatch):
+    from retui.terminal.linux import LinuxTerminal
+
+    class PipeTerminal(LinuxTerminal):
+        # stdin replaced with pipe, tty settings are not touched
+        def __init__(self, stdin):
+            Terminal.__init__(self, None)
+            self.is_interactive_mode = False
+            self.window_changed = False
+            self.input_interpreter = InputInterpreter(stdin)
+
+        def __del__(self):
+            pass
+
+        @staticmethod
+        def get_size():
+            return 20, 5
+
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    stdin = os.fdopen(read_fd, "r")
+    monkeypatch.setattr(sys, "stdin", stdin)
+    app = App(terminal=PipeTerminal(stdin))
+    received = []
+
+    def handle_events(events_list):
+        received.extend(events_list)
+        if len(received) == 1:
+            signal.raise_signal(signal.SIGWINCH)
+        else:
+            app.running = False
+
+    app.handle_events = handle_events
+    os.write(write_fd, b"q")
+    app.init_asyncio()
+    app.running = True
+    try:
+        asyncio.run(asyncio.wait_for(app.main_loop(), 5))
+    finally:
+        stdin.close()
+        os.close(write_fd)
+
+    assert isinstance(received[0], deque) and isinstance(received[0][0], KeyEvent)
+    assert received[0][0].wchar == "q"
+    assert isinstance(received[1], SizeChangeEvent)
@@ -0,0 +1,83 @@
+from retui.enums import TextAlign
+from retui.widgets import StreamText, Text
+
+
+def visible(text: Text, width: int, height: int):
+    text.prepare_lines(width, height)
+    return [text.get_line(idx) for idx in range(0, height)]
+
+
+def test_stream_text_shows_tail():
+    text = StreamText(max_lines=100)
+    for idx in range(0, 10):
+        text.append(f"line {idx}\n")
+    assert visible(text, 8, 3) == ["line 7  ", "line 8  ", "line 9  "]
+
+
+def test_stream_text_is_bounded():
+    text = StreamText(max_lines=5)
+    for idx in range(0, 1000):
+        text.append(f"{idx}\n")
+    assert len(text.raw_lines) == 5
+    assert text.text == "995\n996\n997\n998\n999"
+
+
+def test_stream_text_continues_partial_line():
+    text = StreamText(max_lines=10)
+    text.append("abc")
+    assert visible(text, 6, 2) == ["abc   ", "      "]
+    text.append("def\nxyz")
+    assert visible(text, 4, 3) == ["abcd", "ef  ", "xyz "]
+
+
+def test_stream_text_wraps_only_new_lines():
+    text = StreamText(max_lines=10)
+    text.append("first\n")
+    visible(text, 10, 5)
+    wrapped = text.wrapped_lines[0]
+    text.append("second\n")
+    visible(text, 10, 5)
+    assert text.wrapped_lines[0] is wrapped
+
+
+def full_layout(text: Text, width: int):
+    rows = []
+    for line in text.text.splitlines():
+        rows.extend(text.wrap_line(width, line))
+    return rows
+
+
+def test_text_scroll_matches_full_layout():
+    text = Text("\n".join(f"{idx} " + "x" * (idx % 13) for idx in range(0, 50)))
+    rows = full_layout(text, 6)
+    assert visible(text, 6, 4) == rows[0:4]
+
+    position = 0
+    for step in (1, 3, 10, -2, 7, -15, 25, 100, -4):
+        text.scroll(step)
+        position = min(max(position + step, 0), len(rows) - 4)
+        assert visible(text, 6, 4) == rows[position : position + 4], step
+
+
+def test_text_materializes_only_window():
+    text = Text("line\n" * 100000)
+    text.prepare_lines(10, 5)
+    assert len(text.lines) <= 5 + Text.scroll_margin
+    assert text.scroll_page(1000)
+    assert visible(text, 10, 5) == ["line      "] * 5
+    assert len(text.lines) <= 5 + Text.scroll_margin
+
+
+def test_text_short_keeps_alignment():
+    text = Text("a", text_align=TextAlign.BOTTOM_RIGHT)
+    assert visible(text, 3, 3) == ["   ", "   ", "  a"]
+    assert not text.scroll(1)
+
+
+def test_text_layout_cache_on_resize():
+    text = Text("some longer line of text\n" * 20)
+    first = visible(text, 10, 5)
+    lines = text.lines
+    visible(text, 7, 5)
+    assert visible(text, 10, 5) == first
+    assert text.lines is lines
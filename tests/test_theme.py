@@ -0,0 +1,198 @@
+import dataclasses
+
+import pytest
+
+import retui.theme
+from retui import App
+from retui.base import Color, ColorBits
+from retui.enums import Dock
+from retui.terminal.headless import HeadlessTerminal
+from retui.theme import CssParser, Selector, Selectors
+from retui.widgets import TextBox
+
+
+def rgb(value: int) -> Color:
+    return Color(value, ColorBits.BIT_24)
+
+
+def test_effective_selector_is_cached_and_shared():
+    selectors = Selectors()
+    selectors.add_property([".warning"], "color", "#ff0000")
+    first = selectors.effective_selector(Selector("TextBox", "#box1", [".warning"]))
+    second = selectors.effective_selector(Selector("TextBox", "#box1", [".warning"]))
+    assert first is second
+    assert first.color.foreground == rgb(0xFF0000)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first.color = None
+
+
+def test_effective_selector_specificity():
+    selectors = Selectors()
+    selectors.add_property(["*"], "background-color", "#000010")
+    selectors.add_property(["*"], "color", "#000001")
+    selectors.add_property([".warning"], "color", "#000002")
+    selectors.add_property(["#box1"], "color", "#000003")
+
+    attributes = selectors.effective_selector(Selector("TextBox", "#box1", [".warning"]))
+    assert attributes.color.foreground == rgb(3)
+    # background set only by universal selector is kept
+    assert attributes.color.background == rgb(0x10)
+
+    attributes = selectors.effective_selector(Selector("TextBox", "#box2", [".warning"]))
+    assert attributes.color.foreground == rgb(2)
+    # merging doesn't modify sheet
+    assert selectors.universal_selector.color.foreground == rgb(1)
+
+
+def test_add_property_invalidates_resolved():
+    selectors = Selectors()
+    selectors.add_property([".warning"], "color", "#000001")
+    selector = Selector("TextBox", "#box1", [".warning"])
+    before = selectors.effective_selector(selector)
+    version = selectors.version
+
+    selectors.add_property([".warning"], "color", "#000002")
+    assert selectors.version != version
+    after = selectors.effective_selector(selector)
+    assert after is not before
+    assert after.color.foreground == rgb(2)
+    assert before.color.foreground == rgb(1)
+
+
+def test_widget_style_resolved_once(monkeypatch):
+    theme = retui.theme.Theme.default_theme()
+    monkeypatch.setattr(retui.theme, "_APP_THEME", theme)
+    theme.selectors.add_property([".warning"], "color", "#000001")
+    resolved = []
+    resolve = theme.selectors.resolve
+    monkeypatch.setattr(theme.selectors, "resolve", lambda selector: resolved.append(selector) or resolve(selector))
+
+    widget = TextBox(app=None, classes=["warning"])
+    assert widget.style.color.foreground == rgb(1)
+    assert widget.style is widget.style
+    assert len(resolved) == 1
+
+    theme.selectors.add_property([".warning"], "color", "#000002")
+    assert widget.style.color.foreground == rgb(2)
+    assert len(resolved) == 2
+
+    widget.classes = []
+    assert widget.style.color.foreground.none()
+
+
+def test_widget_style_key_kept_until_changed(monkeypatch):
+    theme = retui.theme.Theme.default_theme()
+    monkeypatch.setattr(retui.theme, "_APP_THEME", theme)
+    theme.selectors.add_property(["#box1"], "color", "#000001")
+    looked_up = []
+    effective_attributes = theme.selectors.effective_attributes
+    monkeypatch.setattr(
+        theme.selectors, "effective_attributes", lambda key: looked_up.append(key) or effective_attributes(key)
+    )
+
+    widget = TextBox(app=None, identifier="box1", classes=["warning"])
+    for _ in range(3):
+        assert widget.style.color.foreground == rgb(1)
+    assert looked_up == [("TextBox", "#box1", (".warning",))]
+
+    widget.identifier = "box2"
+    assert widget.style.color.foreground.none()
+    theme.selectors.add_property(["#box2"], "color", "#000002")
+    assert widget.style.color.foreground == rgb(2)
+    assert looked_up[1:] == [("TextBox", "#box2", (".warning",))] * 2
+
+
+def test_css_parse_rules():
+    rules = CssParser.parse_rules(
+        """
+        @charset "UTF-8";
+        /* comment
+           over lines */
+        * { color: #000001; }
+        .a,
+        #b { background-color: #000002; color: #000003 }
+        @media screen { .a { color: #000004; } }
+        .c {}
+        """
+    )
+    assert rules == [
+        (("*",), (("color", "#000001"),)),
+        ((".a", "#b"), (("background-color", "#000002"), ("color", "#000003"))),
+    ]
+
+
+def test_css_parse_rules_unbalanced():
+    with pytest.raises(Exception):
+        CssParser.parse_rules(".a { color: #000001; ")
+    with pytest.raises(Exception):
+        CssParser.parse_rules(".a { color: #000001; } }")
+
+
+def test_css_parse_uses_cache(tmp_path, monkeypatch):
+    css = tmp_path / "theme.css"
+    css.write_text(".a { color: #000001; }")
+    selectors = CssParser.parse(css, None)
+    assert selectors.class_selectors[".a"].color.foreground == rgb(1)
+    cache = tmp_path / ("theme.css" + CssParser.CACHE_SUFFIX)
+    assert cache.exists()
+
+    # unchanged file is loaded from cache, not parsed
+    with monkeypatch.context() as patch:
+        patch.setattr(CssParser, "parse_rules", None)
+        assert CssParser.parse(css, None).class_selectors[".a"].color.foreground == rgb(1)
+
+    # changed file is parsed again
+    css.write_text(".a { color: #000002; }  ")
+    assert CssParser.parse(css, None).class_selectors[".a"].color.foreground == rgb(2)
+
+
+def test_selectors_update_from_reports_changed():
+    selectors = Selectors()
+    selectors.add_property([".a"], "color", "#000001")
+    selectors.add_property([".b"], "color", "#000001")
+    selectors.add_property(["#c"], "color", "#000001")
+    before = selectors.effective_selector(Selector("TextBox", "#x", [".a"]))
+
+    other = Selectors()
+    other.add_property([".a"], "color", "#000002")
+    other.add_property([".b"], "color", "#000001")
+    other.add_property([".d"], "color", "#000001")
+    assert selectors.update_from(other) == {".a", "#c", ".d"}
+    assert selectors.effective_selector(Selector("TextBox", "#x", [".a"])) != before
+
+    version = selectors.version
+    assert selectors.update_from(other) == set()
+    assert selectors.version == version
+
+
+def test_stylesheet_reload_restyles_only_selected_widgets(tmp_path, monkeypatch):
+    theme = retui.theme.Theme.default_theme()
+    monkeypatch.setattr(retui.theme, "_APP_THEME", theme)
+    css = tmp_path / "theme.css"
+    css.write_text(".warning { color: #000001; } .info { color: #000001; }")
+
+    terminal = HeadlessTerminal(columns=20, rows=6)
+    app = App(terminal=terminal)
+    app.watch_stylesheet(css)
+    warning = TextBox(app=app, x=0, y=0, width=8, height=3, dock=Dock.NONE, text="w", classes=["warning"])
+    info = TextBox(app=app, x=10, y=0, width=8, height=3, dock=Dock.NONE, text="i", classes=["info"])
+    app.add_widget(warning)
+    app.add_widget(info)
+    app.clear(reuse=False)
+    app.render_frame()
+    terminal.take_output()
+    assert terminal.virtual_screen.color_at(1, 1) == ("2;1", None)
+
+    css.write_text(".warning { color: #000002; } .info { color: #000001; }  ")
+    app.reload_stylesheets(theme)
+    assert warning.needs_draw() and not info.needs_draw()
+    app.render_frame()
+    terminal.take_output()
+    assert terminal.virtual_screen.color_at(1, 1) == ("2;2", None)
+    assert terminal.virtual_screen.color_at(11, 1) == ("2;1", None)
+
+    # broken stylesheet keeps previous styling
+    css.write_text(".warning { color: #000003; ")
+    app.reload_stylesheets(theme)
+    assert not warning.needs_draw()
+    assert warning.style.color.foreground == rgb(2)
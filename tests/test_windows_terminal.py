@@ -0,0 +1,102 @@
+import sys
+import types
+
+import pytest
+
+from retui.input_handling import KeyEvent, MouseEvent
+from retui.input_handling.windows import INPUT_RECORD
+from retui.terminal.base import SizeChangeEvent
+
+
+@pytest.fixture
+def windows_terminal(monkeypatch):
+    # msvcrt is only imported, handles are never used by fake kernel32
+    monkeypatch.setitem(sys.modules, "msvcrt", types.ModuleType("msvcrt"))
+    monkeypatch.delitem(sys.modules, "retui.terminal.windows", raising=False)
+    from retui.terminal.windows import WindowsTerminal
+
+    return WindowsTerminal
+
+
+class FakeConsole:
+    """
+    Stands in for kernel32 console input functions, serves synthetic records
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = 0
+
+    def get_number_of_console_input_events(self, handle, number_of_events):
+        number_of_events._obj.value = len(self.records)
+        return 1
+
+    def read_console_input(self, handle, buffer, length, number_of_events):
+        self.calls += 1
+        count = min(length, len(self.records))
+        for idx in range(count):
+            buffer[idx] = self.records[idx]
+        del self.records[:count]
+        number_of_events._obj.value = count
+        return 1
+
+
+def key_record(vk_code, char):
+    record = INPUT_RECORD()
+    record.EventType = 0x1
+    record.Event.KeyEvent.bKeyDown = 1
+    record.Event.KeyEvent.wRepeatCount = 1
+    record.Event.KeyEvent.wVirtualKeyCode = vk_code
+    record.Event.KeyEvent.uChar.UnicodeChar = char
+    return record
+
+
+def mouse_move_record(x, y):
+    record = INPUT_RECORD()
+    record.EventType = 0x2
+    record.Event.MouseEvent.dwMousePosition.X = x
+    record.Event.MouseEvent.dwMousePosition.Y = y
+    record.Event.MouseEvent.dwEventFlags = 0x1
+    return record
+
+
+def make_terminal(cls, records, batch_size=128):
+    terminal = cls.__new__(cls)
+    terminal.event_pool = None
+    terminal.blocking = False
+    terminal.consoleHandleIn = 0
+    terminal.read_batch_size = batch_size
+    terminal.input_records = (INPUT_RECORD * batch_size)()
+    console = FakeConsole(records)
+    terminal.getNumberOfConsoleInputEvents = console.get_number_of_console_input_events
+    terminal.readConsoleInput = console.read_console_input
+    return terminal, console
+
+
+def test_records_read_in_single_batch(windows_terminal):
+    records = [key_record(0x41, "a")]
+    records += [mouse_move_record(x, 2) for x in range(50)]
+    size_record = INPUT_RECORD()
+    size_record.EventType = 0x4
+    records += [size_record, key_record(0x42, "b")]
+    terminal, console = make_terminal(windows_terminal, records)
+
+    batches = []
+    terminal.read_events(lambda ctx, events: batches.append(events), None)
+
+    assert console.calls == 1 and len(batches) == 1
+    events = batches[0]
+    assert [type(event) for event in events] == [KeyEvent, MouseEvent, SizeChangeEvent, KeyEvent]
+    assert events[0].wchar == "a" and events[3].wchar == "b"
+    # motion coalesced to latest position
+    assert events[1].coordinates == (49, 2)
+
+
+def test_batch_limited_to_array_size(windows_terminal):
+    terminal, console = make_terminal(windows_terminal, [key_record(0x41, "a") for _ in range(10)], batch_size=4)
+    batches = []
+    while console.records:
+        terminal.read_events(lambda ctx, events: batches.append(events), None)
+    assert [len(events) for events in batches] == [4, 4, 2]
+    terminal.read_events(lambda ctx, events: batches.append(events), None)
+    assert len(batches) == 3